@@ -1,494 +1,876 @@
-#!/usr/bin/env python3
-"""
-Combined script to setup pipeline, create index, and ingest PDFs.
-Runs all steps in sequence for easy deployment.
-"""
-
-import sys
-import argparse
-import requests
-import base64
-import json
-from pathlib import Path
-
-try:
-    import yaml
-except ImportError:
-    yaml = None
-
-SCRIPT_DIR = Path(__file__).resolve().parent
-DEFAULT_CONFIG_PATH = SCRIPT_DIR.parent / "config" / "elasticsearch.yml"
-DEFAULT_MAPPING_PATH = SCRIPT_DIR.parent / "config" / "mappings-contracts.json"
-
-# Default values
-ES_INDEX = 'contracts'
-DEFAULT_INFERENCE_ENDPOINT = '.elser-2-elastic'
-
-
-def load_yaml(path: Path) -> dict:
-    """Load YAML configuration file."""
-    if not path.exists():
-        raise FileNotFoundError(f"Config file not found: {path}")
-
-    if yaml is None:
-        raise RuntimeError(
-            "PyYAML is required to load configuration files. Install with 'pip install PyYAML'."
-        )
-
-    with path.open("r", encoding="utf-8") as handle:
-        data = yaml.safe_load(handle) or {}
-
-    if not isinstance(data, dict):
-        raise ValueError(f"Configuration must be a mapping (found {type(data).__name__})")
-    return data
-
-
-def load_json(path: Path) -> dict:
-    """Load JSON configuration file."""
-    if not path.exists():
-        raise FileNotFoundError(f"JSON file not found: {path}")
-
-    with path.open("r", encoding="utf-8") as handle:
-        data = json.load(handle)
-
-    if not isinstance(data, dict):
-        raise ValueError(f"JSON file must define a JSON object (found {type(data).__name__})")
-    return data
-
-
-def build_auth_header(config: dict) -> str:
-    """Build authorization header from config (prefer api_key over user/password)."""
-    api_key = config.get("api_key", "").strip()
-    if api_key:
-        return f"ApiKey {api_key}"
-    
-    user = config.get("user", "").strip()
-    password = config.get("password", "").strip()
-    if user and password:
-        token = f"{user}:{password}"
-        encoded = base64.b64encode(token.encode("utf-8")).decode("ascii")
-        return f"Basic {encoded}"
-    
-    raise ValueError("Config must include either 'api_key' or both 'user' and 'password'")
-
-
-def load_config(config_path: Path = None) -> tuple:
-    """Load Elasticsearch configuration and return endpoint and headers."""
-    if config_path is None:
-        config_path = DEFAULT_CONFIG_PATH
-    
-    config = load_yaml(config_path)
-    
-    endpoint = config.get("endpoint", "").strip()
-    if not endpoint:
-        raise ValueError("Config must include an 'endpoint'")
-    
-    auth_header = build_auth_header(config)
-    headers = {
-        "Authorization": auth_header,
-        "Content-Type": "application/json"
-    }
-    
-    # Add any custom headers from config
-    custom_headers = config.get("headers", {})
-    if isinstance(custom_headers, dict):
-        headers.update({str(k): str(v) for k, v in custom_headers.items()})
-    
-    return endpoint, headers
-
-
-# Global variables (will be set in main)
-ES_ENDPOINT = None
-headers = None
-INFERENCE_ENDPOINT = DEFAULT_INFERENCE_ENDPOINT  # Default, will be auto-detected if not found
-
-
-def check_elasticsearch():
-    """Check if Elasticsearch is reachable."""
-    try:
-        response = requests.get(ES_ENDPOINT, headers=headers, timeout=5)
-        if response.status_code == 200:
-            info = response.json()
-            print(f"Cluster: {info.get('cluster_name', 'unknown')}")
-            print(f"Status: {info.get('status', 'unknown')}")
-            return True
-        else:
-            print(f"Failed to connect: HTTP {response.status_code}")
-            return False
-    except Exception as e:
-        print(f"Connection error: {str(e)}")
-        return False
-
-
-def check_inference_endpoint():
-    """Check if ELSER inference endpoint is available, auto-detect if needed."""
-    global INFERENCE_ENDPOINT
-    
-    try:
-        response = requests.get(f"{ES_ENDPOINT}/_inference/_all", headers=headers)
-        if response.status_code == 200:
-            endpoints = response.json().get('endpoints', [])
-            
-            # First, try to find the specified endpoint
-            for endpoint in endpoints:
-                if endpoint.get('inference_id') == INFERENCE_ENDPOINT:
-                    print(f"Found inference endpoint: {INFERENCE_ENDPOINT}")
-                    return True
-            
-            # If not found, try to auto-detect any ELSER endpoint
-            elser_endpoints = []
-            for endpoint in endpoints:
-                inference_id = endpoint.get('inference_id', '')
-                if 'elser' in inference_id.lower():
-                    elser_endpoints.append(inference_id)
-            
-            if elser_endpoints:
-                # Prefer endpoints starting with .elser-2- or .elser_model_2
-                preferred = [e for e in elser_endpoints if '.elser-2-' in e or '.elser_model_2' in e]
-                if preferred:
-                    INFERENCE_ENDPOINT = preferred[0]
-                else:
-                    INFERENCE_ENDPOINT = elser_endpoints[0]
-                
-                print(f"Specified endpoint not found, using auto-detected: {INFERENCE_ENDPOINT}")
-                return True
-            
-            print(f"Inference endpoint '{INFERENCE_ENDPOINT}' not found")
-            print("Available endpoints:")
-            for endpoint in endpoints:
-                print(f"  - {endpoint.get('inference_id')}")
-            return False
-        else:
-            print(f"Could not check inference endpoints: HTTP {response.status_code}")
-            return True  # Continue anyway
-    except Exception as e:
-        print(f"Error checking inference endpoint: {str(e)}")
-        print("Continuing anyway...")
-        return True  # Continue anyway
-
-
-def create_pipeline():
-    """Create the PDF processing pipeline."""
-    pipeline_path = SCRIPT_DIR.parent / "config" / "pipeline-contracts.json"
-    
-    try:
-        pipeline_config = load_json(pipeline_path)
-    except Exception as e:
-        print(f"Error loading pipeline config: {e}")
-        return False
-
-    try:
-        response = requests.put(
-            f"{ES_ENDPOINT}/_ingest/pipeline/pdf_pipeline",
-            headers=headers,
-            json=pipeline_config
-        )
-
-        if response.status_code == 200:
-            return True
-        else:
-            print(f"Failed to create pipeline: HTTP {response.status_code}")
-            print(json.dumps(response.json(), indent=2))
-            return False
-    except Exception as e:
-        print(f"Error creating pipeline: {str(e)}")
-        return False
-
-
-def check_index_exists():
-    """Check if the index already exists."""
-    try:
-        response = requests.head(f"{ES_ENDPOINT}/{ES_INDEX}", headers=headers)
-        return response.status_code == 200
-    except:
-        return False
-
-
-def create_index(mapping):
-    """Create index with proper mappings."""
-    # Delete index if it exists before creating a new one
-    if check_index_exists():
-        print(f"Deleting existing index '{ES_INDEX}' before import")
-        try:
-            response = requests.delete(f"{ES_ENDPOINT}/{ES_INDEX}", headers=headers)
-            if response.status_code == 200:
-                print(f"Index '{ES_INDEX}' deleted")
-            else:
-                print(f"Failed to delete index: HTTP {response.status_code}")
-        except Exception as e:
-            print(f"Failed to delete index: {str(e)}")
-
-    # Update mapping with detected inference endpoint
-    mapping_with_inference = mapping.copy()
-    if 'mappings' in mapping_with_inference and 'properties' in mapping_with_inference['mappings']:
-        if 'semantic_content' in mapping_with_inference['mappings']['properties']:
-            mapping_with_inference['mappings']['properties']['semantic_content']['inference_id'] = INFERENCE_ENDPOINT
-
-    print(f"Creating index: {ES_INDEX}")
-    try:
-        response = requests.put(
-            f"{ES_ENDPOINT}/{ES_INDEX}",
-            headers=headers,
-            json=mapping_with_inference
-        )
-
-        if response.status_code == 200:
-            print(f"Successfully created index: {ES_INDEX}")
-            return True
-        else:
-            print(f"Failed to create index: HTTP {response.status_code}")
-            print(json.dumps(response.json(), indent=2))
-            return False
-    except Exception as e:
-        print(f"Error creating index: {str(e)}")
-        return False
-
-
-def get_pdf_files(path):
-    """Get list of PDF files from a path."""
-    path_obj = Path(path)
-
-    if not path_obj.exists():
-        print(f"Path '{path}' does not exist")
-        return []
-
-    if path_obj.is_file():
-        if path_obj.suffix.lower() == '.pdf':
-            return [path_obj]
-        else:
-            print(f"'{path}' is not a PDF file")
-            return []
-
-    elif path_obj.is_dir():
-        pdf_files = list(path_obj.glob('*.pdf'))
-        if not pdf_files:
-            print(f"No PDF files found in directory '{path}'")
-        return pdf_files
-
-    return []
-
-
-def extract_airline_name(filename):
-    """Extract airline name from filename."""
-    filename_lower = filename.lower()
-
-    # Handle both old and new naming conventions
-    if 'american' in filename_lower:
-        return 'American Airlines'
-    elif 'southwest' in filename_lower:
-        return 'Southwest'
-    elif 'united' in filename_lower:
-        return 'United'
-    elif 'delta' in filename_lower or 'dl-' in filename_lower:
-        return 'Delta'
-    else:
-        return 'Unknown'
-
-
-def index_pdf(pdf_path):
-    """Index a single PDF file."""
-    pdf_path = Path(pdf_path)
-    filename = pdf_path.name
-    airline = extract_airline_name(filename)
-
-    try:
-        # Read and encode the PDF
-        with open(pdf_path, 'rb') as pdf_file:
-            encoded_pdf = base64.b64encode(pdf_file.read()).decode('utf-8')
-
-        # Index the document
-        index_payload = {
-            "data": encoded_pdf,
-            "filename": filename,
-            "airline": airline
-        }
-
-        response = requests.post(
-            f"{ES_ENDPOINT}/{ES_INDEX}/_doc?pipeline=pdf_pipeline",
-            headers=headers,
-            json=index_payload
-        )
-
-        if response.status_code in [200, 201]:
-            # Don't print here - progress is handled in ingest_pdfs()
-            return True
-        else:
-            # Only print errors, not success messages
-            print(f"\nIndexing failed for {filename}: HTTP {response.status_code}")
-            print(json.dumps(response.json(), indent=2))
-            return False
-
-    except Exception as e:
-        print(f"\nError processing {filename}: {str(e)}")
-        return False
-
-
-def ingest_pdfs(pdf_path):
-    """Ingest all PDFs from the specified path."""
-    pdf_files = get_pdf_files(pdf_path)
-
-    if not pdf_files:
-        print("No PDF files to process")
-        return False
-
-    total_files = len(pdf_files)
-    print(f"Processing {total_files} PDF file(s)...")
-
-    success_count = 0
-    failed_count = 0
-    processed_count = 0
-
-    for pdf_file in pdf_files:
-        if index_pdf(pdf_file):
-            success_count += 1
-        else:
-            failed_count += 1
-        
-        processed_count += 1
-        
-        # Update progress
-        percentage = round(processed_count / total_files * 100, 1)
-        progress = f"\r{processed_count} of {total_files} files processed ({percentage}%)"
-        sys.stdout.write(progress)
-        sys.stdout.flush()
-
-    # Print newline after progress line
-    print()
-    
-    print(f"Indexed {success_count} of {total_files} file(s)")
-    if failed_count > 0:
-        print(f"Failed: {failed_count}")
-
-    return failed_count == 0
-
-
-def verify_ingestion():
-    """Verify documents were ingested successfully."""
-    try:
-        response = requests.get(f"{ES_ENDPOINT}/{ES_INDEX}/_count", headers=headers)
-        if response.status_code == 200:
-            count = response.json().get('count', 0)
-            print(f"Index '{ES_INDEX}' contains {count} document(s)")
-            return True
-        else:
-            print(f"Could not verify document count")
-            return True
-    except Exception as e:
-        print(f"Could not verify document count: {str(e)}")
-        return True
-
-
-def main():
-    global ES_ENDPOINT, headers, INFERENCE_ENDPOINT
-    
-    parser = argparse.ArgumentParser(
-        description='Setup Elasticsearch infrastructure and ingest PDF files',
-        formatter_class=argparse.RawDescriptionHelpFormatter,
-        epilog="""
-Examples:
-  # Setup and ingest PDFs from default location
-  python3 import_contracts.py
-
-  # Setup and ingest PDFs from specific directory
-  python3 import_contracts.py --pdf-path /path/to/pdfs
-
-  # Only setup infrastructure (skip PDF ingestion)
-  python3 import_contracts.py --setup-only
-
-  # Skip setup and only ingest PDFs
-  python3 import_contracts.py --ingest-only
-        """
-    )
-
-    parser.add_argument(
-        '-c', '--config',
-        default=str(DEFAULT_CONFIG_PATH),
-        help=f'Path to Elasticsearch config YAML (default: {DEFAULT_CONFIG_PATH})'
-    )
-    parser.add_argument(
-        '-m', '--mapping',
-        default=str(DEFAULT_MAPPING_PATH),
-        help=f'Path to mappings JSON (default: {DEFAULT_MAPPING_PATH})'
-    )
-    parser.add_argument(
-        '--pdf-path',
-        default='data',
-        help='Path to PDF file or directory containing PDFs (default: data)'
-    )
-    parser.add_argument(
-        '--setup-only',
-        action='store_true',
-        help='Only setup infrastructure (pipeline and index), skip PDF ingestion'
-    )
-    parser.add_argument(
-        '--ingest-only',
-        action='store_true',
-        help='Skip setup, only ingest PDFs (assumes infrastructure exists)'
-    )
-    parser.add_argument(
-        '--inference-endpoint',
-        help='Inference endpoint ID (default: .elser-2-elastic, will auto-detect if not found)'
-    )
-
-    args = parser.parse_args()
-    
-    # Set inference endpoint if provided
-    if args.inference_endpoint:
-        INFERENCE_ENDPOINT = args.inference_endpoint
-    
-    # Load configuration
-    try:
-        ES_ENDPOINT, headers = load_config(Path(args.config))
-    except Exception as e:
-        print(f"Failed to load config: {e}")
-        sys.exit(1)
-
-    # Load mapping
-    try:
-        mapping = load_json(Path(args.mapping).resolve())
-    except Exception as e:
-        print(f"Failed to load mapping: {e}")
-        sys.exit(1)
-
-    # Check Elasticsearch connection
-    if not check_elasticsearch():
-        print("Cannot connect to Elasticsearch. Exiting.")
-        sys.exit(1)
-
-    # Setup phase
-    if not args.ingest_only:
-        # Check ELSER endpoint
-        if not check_inference_endpoint():
-            print("ELSER inference endpoint not found!")
-            print("Please deploy ELSER via Kibana or API before continuing.")
-            print("See: Management → Machine Learning → Trained Models → ELSER → Deploy")
-            sys.exit(1)
-
-        # Create pipeline
-        if not create_pipeline():
-            print("Failed to create pipeline. Exiting.")
-            sys.exit(1)
-
-        # Create index (will delete existing one if present)
-        if not create_index(mapping):
-            print("Failed to create index. Exiting.")
-            sys.exit(1)
-
-    # Ingestion phase
-    if not args.setup_only:
-        import time
-        start_time = time.time()
-
-        if not ingest_pdfs(args.pdf_path):
-            print("PDF ingestion had errors.")
-            sys.exit(1)
-
-        elapsed_time = time.time() - start_time
-        print(f"Total ingestion time: {elapsed_time:.2f} seconds")
-
-        # Verify ingestion
-        verify_ingestion()
-
-
-if __name__ == "__main__":
-    main()
+#!/usr/bin/env python3
+"""
+Combined script to setup pipeline, create index, and ingest PDFs.
+Runs all steps in sequence for easy deployment.
+"""
+
+import sys
+import argparse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import base64
+import gzip
+import json
+import logging
+import mmap
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from PyPDF2 import PdfReader
+except ImportError:
+    PdfReader = None
+
+LOGGER = logging.getLogger(__name__)
+SCRIPT_DIR = Path(__file__).resolve().parent
+DEFAULT_CONFIG_PATH = SCRIPT_DIR.parent / "config" / "elasticsearch.yml"
+DEFAULT_MAPPING_PATH = SCRIPT_DIR.parent / "config" / "mappings-contracts.json"
+
+# Default values
+ES_INDEX = 'contracts'
+DEFAULT_INFERENCE_ENDPOINT = '.elser-2-elastic'
+
+# Filename patterns -> airline name, checked in order (handles old and new naming conventions)
+AIRLINE_PATTERNS = (
+    (re.compile(r'american', re.IGNORECASE), 'American Airlines'),
+    (re.compile(r'southwest', re.IGNORECASE), 'Southwest'),
+    (re.compile(r'united', re.IGNORECASE), 'United'),
+    (re.compile(r'delta|dl-', re.IGNORECASE), 'Delta'),
+)
+
+# PDFs are sent through _bulk; a request is flushed at whichever limit is hit first
+BULK_MAX_DOCS = 64
+BULK_MAX_BYTES = 10 * 1024 * 1024
+# The docs-per-request limit adapts to bulk latency: it starts small, doubles while
+# requests finish quickly and halves when they are slow or throttled (HTTP 429)
+BULK_INITIAL_DOCS = 4
+BULK_FAST_SECONDS = 10
+BULK_SLOW_SECONDS = 30
+# PDFs rejected with HTTP 429 are resent up to BULK_MAX_RETRIES times, waiting
+# BULK_RETRY_DELAY seconds before the first retry and twice as long before each next one
+BULK_MAX_RETRIES = 5
+BULK_RETRY_DELAY = 2
+# PDFs are base64-encoded in chunks; a multiple of 3 bytes never produces padding mid-stream
+BASE64_CHUNK_SIZE = 57 * 1024
+# The target index is in the _bulk URL, so every action line is the same
+BULK_ACTION_LINE = b'{"index":{}}\n'
+# Only the per-item status and error are read back from _bulk responses
+BULK_FILTER_PATH = "items.*.status,items.*.error"
+# Bulk bodies larger than this are gzipped; base64 text compresses well even at level 1
+GZIP_MIN_BYTES = 16 * 1024
+# Bulk requests in flight at once; attachment extraction and ELSER run on the cluster
+DEFAULT_CONCURRENCY = 4
+
+# Index settings relaxed while PDFs are ingested and restored afterwards
+INGEST_INDEX_SETTINGS = {
+    "index.refresh_interval": "-1",
+    "index.number_of_replicas": "0",
+    "index.translog.flush_threshold_size": "1gb",
+}
+
+
+def load_yaml(path: Path) -> dict:
+    """Load YAML configuration file."""
+    if not path.exists():
+        raise FileNotFoundError(f"Config file not found: {path}")
+
+    if yaml is None:
+        raise RuntimeError(
+            "PyYAML is required to load configuration files. Install with 'pip install PyYAML'."
+        )
+
+    with path.open("r", encoding="utf-8") as handle:
+        data = yaml.safe_load(handle) or {}
+
+    if not isinstance(data, dict):
+        raise ValueError(f"Configuration must be a mapping (found {type(data).__name__})")
+    return data
+
+
+def load_json(path: Path) -> dict:
+    """Load JSON configuration file."""
+    if not path.exists():
+        raise FileNotFoundError(f"JSON file not found: {path}")
+
+    with path.open("r", encoding="utf-8") as handle:
+        data = json.load(handle)
+
+    if not isinstance(data, dict):
+        raise ValueError(f"JSON file must define a JSON object (found {type(data).__name__})")
+    return data
+
+
+def validate_mapping(mapping: dict) -> None:
+    """Check the index body's shape locally so typos fail before any request is sent."""
+    properties = mapping.get("mappings", {}).get("properties")
+    if not isinstance(properties, dict) or not properties:
+        raise ValueError("Mapping must define a non-empty 'mappings.properties' object")
+    for name, field in properties.items():
+        if not isinstance(field, dict) or not ("type" in field or "properties" in field):
+            raise ValueError(f"Mapping field '{name}' must define a 'type' or 'properties'")
+
+
+def validate_pipeline(pipeline: dict) -> None:
+    """Check the pipeline body's shape locally so typos fail before any request is sent."""
+    processors = pipeline.get("processors")
+    if not isinstance(processors, list) or not processors:
+        raise ValueError("Pipeline must define a non-empty 'processors' list")
+    for position, processor in enumerate(processors):
+        if not isinstance(processor, dict) or len(processor) != 1:
+            raise ValueError(f"Pipeline processor {position} must be an object with exactly one processor type")
+
+
+def build_auth_header(config: dict) -> str:
+    """Build authorization header from config (prefer api_key over user/password)."""
+    api_key = config.get("api_key", "").strip()
+    if api_key:
+        return f"ApiKey {api_key}"
+    
+    user = config.get("user", "").strip()
+    password = config.get("password", "").strip()
+    if user and password:
+        token = f"{user}:{password}"
+        encoded = base64.b64encode(token.encode("utf-8")).decode("ascii")
+        return f"Basic {encoded}"
+    
+    raise ValueError("Config must include either 'api_key' or both 'user' and 'password'")
+
+
+def load_config(config_path: Path = None) -> tuple:
+    """Load Elasticsearch configuration and return endpoint and headers."""
+    if config_path is None:
+        config_path = DEFAULT_CONFIG_PATH
+    
+    config = load_yaml(config_path)
+    
+    endpoint = config.get("endpoint", "").strip()
+    if not endpoint:
+        raise ValueError("Config must include an 'endpoint'")
+    
+    auth_header = build_auth_header(config)
+    headers = {
+        "Authorization": auth_header,
+        "Content-Type": "application/json"
+    }
+    
+    # Add any custom headers from config
+    custom_headers = config.get("headers", {})
+    if isinstance(custom_headers, dict):
+        headers.update({str(k): str(v) for k, v in custom_headers.items()})
+    
+    return endpoint, headers
+
+
+def create_session():
+    """Create an HTTP session that keeps connections to Elasticsearch alive between requests."""
+    retry = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 502, 503, 504],
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=16, max_retries=retry)
+    http_session = requests.Session()
+    http_session.mount("http://", adapter)
+    http_session.mount("https://", adapter)
+    return http_session
+
+
+# Global variables (will be set in main)
+ES_ENDPOINT = None
+headers = None
+session = None
+INFERENCE_ENDPOINT = DEFAULT_INFERENCE_ENDPOINT  # Default, will be auto-detected if not found
+
+
+def check_elasticsearch():
+    """Check if Elasticsearch is reachable."""
+    try:
+        response = session.get(ES_ENDPOINT, headers=headers, timeout=5)
+        if response.status_code == 200:
+            info = json_loads(response.content)
+            print(f"Cluster: {info.get('cluster_name', 'unknown')}")
+            print(f"Status: {info.get('status', 'unknown')}")
+            return True
+        else:
+            print(f"Failed to connect: HTTP {response.status_code}")
+            return False
+    except Exception as e:
+        print(f"Connection error: {str(e)}")
+        return False
+
+
+def check_inference_endpoint():
+    """Check if ELSER inference endpoint is available, auto-detect if needed."""
+    global INFERENCE_ENDPOINT
+    
+    try:
+        response = session.get(f"{ES_ENDPOINT}/_inference/_all", headers=headers)
+        if response.status_code == 200:
+            endpoints = json_loads(response.content).get('endpoints', [])
+            
+            # First, try to find the specified endpoint
+            for endpoint in endpoints:
+                if endpoint.get('inference_id') == INFERENCE_ENDPOINT:
+                    print(f"Found inference endpoint: {INFERENCE_ENDPOINT}")
+                    return True
+            
+            # If not found, try to auto-detect any ELSER endpoint
+            elser_endpoints = []
+            for endpoint in endpoints:
+                inference_id = endpoint.get('inference_id', '')
+                if 'elser' in inference_id.lower():
+                    elser_endpoints.append(inference_id)
+            
+            if elser_endpoints:
+                # Prefer endpoints starting with .elser-2- or .elser_model_2
+                preferred = [e for e in elser_endpoints if '.elser-2-' in e or '.elser_model_2' in e]
+                if preferred:
+                    INFERENCE_ENDPOINT = preferred[0]
+                else:
+                    INFERENCE_ENDPOINT = elser_endpoints[0]
+                
+                print(f"Specified endpoint not found, using auto-detected: {INFERENCE_ENDPOINT}")
+                return True
+            
+            print(f"Inference endpoint '{INFERENCE_ENDPOINT}' not found")
+            print("Available endpoints:")
+            for endpoint in endpoints:
+                print(f"  - {endpoint.get('inference_id')}")
+            return False
+        else:
+            print(f"Could not check inference endpoints: HTTP {response.status_code}")
+            return True  # Continue anyway
+    except Exception as e:
+        print(f"Error checking inference endpoint: {str(e)}")
+        print("Continuing anyway...")
+        return True  # Continue anyway
+
+
+def create_pipeline():
+    """Create the PDF processing pipeline."""
+    pipeline_path = SCRIPT_DIR.parent / "config" / "pipeline-contracts.json"
+    
+    try:
+        pipeline_config = load_json(pipeline_path)
+        validate_pipeline(pipeline_config)
+    except Exception as e:
+        print(f"Error loading pipeline config: {e}")
+        return False
+
+    try:
+        response = session.put(
+            f"{ES_ENDPOINT}/_ingest/pipeline/pdf_pipeline",
+            headers=headers,
+            json=pipeline_config
+        )
+
+        if response.status_code == 200:
+            return True
+        else:
+            print(f"Failed to create pipeline: HTTP {response.status_code}")
+            print(json.dumps(response.json(), indent=2))
+            return False
+    except Exception as e:
+        print(f"Error creating pipeline: {str(e)}")
+        return False
+
+
+def delete_index():
+    """Delete the index if it exists; a missing index is not an error."""
+    try:
+        response = session.delete(f"{ES_ENDPOINT}/{ES_INDEX}", headers=headers)
+        if response.status_code == 200:
+            print(f"Deleted existing index '{ES_INDEX}' before import")
+        elif response.status_code != 404:
+            print(f"Failed to delete index: HTTP {response.status_code}")
+    except Exception as e:
+        print(f"Failed to delete index: {str(e)}")
+
+
+def create_index(mapping):
+    """Create index with proper mappings."""
+    # Delete index if it exists before creating a new one (one DELETE instead of HEAD + DELETE)
+    delete_index()
+
+    # Update mapping with detected inference endpoint
+    mapping_with_inference = mapping.copy()
+    if 'mappings' in mapping_with_inference and 'properties' in mapping_with_inference['mappings']:
+        if 'semantic_content' in mapping_with_inference['mappings']['properties']:
+            mapping_with_inference['mappings']['properties']['semantic_content']['inference_id'] = INFERENCE_ENDPOINT
+
+    print(f"Creating index: {ES_INDEX}")
+    try:
+        response = session.put(
+            f"{ES_ENDPOINT}/{ES_INDEX}",
+            headers=headers,
+            json=mapping_with_inference
+        )
+
+        if response.status_code == 200:
+            print(f"Successfully created index: {ES_INDEX}")
+            return True
+        else:
+            print(f"Failed to create index: HTTP {response.status_code}")
+            print(json.dumps(response.json(), indent=2))
+            return False
+    except Exception as e:
+        print(f"Error creating index: {str(e)}")
+        return False
+
+
+def get_pdf_files(path):
+    """Get list of PDF files from a path."""
+    path_obj = Path(path)
+
+    if not path_obj.exists():
+        print(f"Path '{path}' does not exist")
+        return []
+
+    if path_obj.is_file():
+        if path_obj.suffix.lower() == '.pdf':
+            return [path_obj]
+        else:
+            print(f"'{path}' is not a PDF file")
+            return []
+
+    elif path_obj.is_dir():
+        pdf_files = list(iter_pdf_files(path_obj))
+        if not pdf_files:
+            print(f"No PDF files found in directory '{path}'")
+        return pdf_files
+
+    return []
+
+
+def iter_pdf_files(directory):
+    """Yield the PDF files directly inside a directory."""
+    # scandir reuses the directory entry's cached type instead of building a
+    # Path and matching a glob pattern for every entry
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.endswith('.pdf') and entry.is_file():
+                yield Path(entry.path)
+
+
+def extract_airline_name(filename):
+    """Extract airline name from filename."""
+    for pattern, airline in AIRLINE_PATTERNS:
+        if pattern.search(filename):
+            return airline
+    return 'Unknown'
+
+
+def encode_pdf(pdf_path, entry):
+    """Append the base64 encoding of a PDF to a bytearray, one chunk at a time."""
+    with open(pdf_path, 'rb') as pdf_file:
+        try:
+            # Map the file so chunks are encoded from the page cache without copies
+            mapped = mmap.mmap(pdf_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # Empty files (and some filesystems) cannot be mapped
+            mapped = None
+
+        if mapped is None:
+            while True:
+                chunk = pdf_file.read(BASE64_CHUNK_SIZE)
+                if not chunk:
+                    break
+                entry += base64.b64encode(chunk)
+            return
+
+        with mapped, memoryview(mapped) as view:
+            for offset in range(0, len(view), BASE64_CHUNK_SIZE):
+                entry += base64.b64encode(view[offset:offset + BASE64_CHUNK_SIZE])
+
+
+def json_bytes(value):
+    """Serialize a value to compact JSON bytes (orjson when available)."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":")).encode('utf-8')
+
+
+def json_loads(content):
+    """Parse a JSON response body (orjson when available)."""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def extract_attachment(pdf_path):
+    """Extract text and metadata from a PDF locally, shaped like the attachment processor output."""
+    reader = PdfReader(str(pdf_path))
+    content = "\n".join(page.extract_text() or "" for page in reader.pages).strip()
+    attachment = {
+        "content": content,
+        "content_length": len(content),
+        "content_type": "application/pdf"
+    }
+
+    metadata = reader.metadata
+    if metadata:
+        if metadata.title:
+            attachment["title"] = str(metadata.title)
+        if metadata.author:
+            attachment["author"] = str(metadata.author)
+    return attachment
+
+
+def build_bulk_entry(pdf_path, extract_local=False):
+    """Build the NDJSON action and source lines that index a single PDF."""
+    pdf_path = Path(pdf_path)
+    filename = pdf_path.name
+    airline = extract_airline_name(filename)
+
+    if extract_local:
+        # Only the extracted text is sent; the pipeline skips the attachment
+        # processor when there is no "data" field
+        source = {
+            "attachment": extract_attachment(pdf_path),
+            "filename": filename,
+            "airline": airline
+        }
+        return BULK_ACTION_LINE + json_bytes(source) + b"\n"
+
+    # The source line is assembled as bytes around the base64 data (which never
+    # needs JSON escaping) so the PDF is not copied through str and json.dumps
+    entry = bytearray(BULK_ACTION_LINE)
+    entry += b'{"data":"'
+    encode_pdf(pdf_path, entry)
+    entry += b'","filename":' + json_bytes(filename)
+    entry += b',"airline":' + json_bytes(airline) + b'}\n'
+    return entry
+
+
+class BulkBatchSize:
+    """Number of PDFs per bulk request, adjusted from the latency of completed requests."""
+
+    def __init__(self, initial=BULK_INITIAL_DOCS, minimum=1, maximum=BULK_MAX_DOCS):
+        self.docs = initial
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def update(self, latency, throttled):
+        if throttled or latency > BULK_SLOW_SECONDS:
+            self.docs = max(self.docs // 2, self.minimum)
+        elif latency < BULK_FAST_SECONDS:
+            self.docs = min(self.docs * 2, self.maximum)
+
+
+def iter_bulk_batches(pdf_files, failures, extract_local=False, batch_size=None):
+    """Group encoded PDFs into bulk batches of (filename, entry) pairs.
+
+    Files that cannot be read are appended to ``failures`` instead of being batched.
+    Each batch holds at most ``batch_size.docs`` PDFs, read when the batch fills up.
+    """
+    if batch_size is None:
+        batch_size = BulkBatchSize(BULK_MAX_DOCS)
+
+    batch = []
+    batch_bytes = 0
+
+    for pdf_file in pdf_files:
+        filename = Path(pdf_file).name
+        try:
+            entry = build_bulk_entry(pdf_file, extract_local)
+        except Exception as e:
+            LOGGER.error("Error processing %s: %s", filename, e)
+            failures.append(filename)
+            continue
+
+        if batch and batch_bytes + len(entry) > BULK_MAX_BYTES:
+            yield batch
+            batch = []
+            batch_bytes = 0
+
+        batch.append((filename, entry))
+        batch_bytes += len(entry)
+
+        if len(batch) >= batch_size.docs:
+            yield batch
+            batch = []
+            batch_bytes = 0
+
+    if batch:
+        yield batch
+
+
+def send_bulk(batch):
+    """Index a batch of PDFs with one _bulk request.
+
+    Returns ``(indexed, rejected)``: the number of PDFs indexed and the
+    ``(filename, entry)`` pairs that Elasticsearch rejected with HTTP 429, which
+    may be sent again. Other failures are logged and not returned.
+    """
+    body = b"".join(entry for _, entry in batch)
+    bulk_headers = {**headers, "Content-Type": "application/x-ndjson"}
+    if len(body) > GZIP_MIN_BYTES:
+        body = gzip.compress(body, compresslevel=1)
+        bulk_headers["Content-Encoding"] = "gzip"
+
+    try:
+        response = session.post(
+            f"{ES_ENDPOINT}/{ES_INDEX}/_bulk?pipeline=pdf_pipeline&filter_path={BULK_FILTER_PATH}",
+            headers=bulk_headers,
+            data=body
+        )
+    except Exception as e:
+        LOGGER.error("Bulk request failed: %s", e)
+        return 0, []
+
+    if response.status_code == 429:
+        return 0, list(batch)
+    if response.status_code != 200:
+        LOGGER.error("Bulk request failed: HTTP %s %s", response.status_code, response.text)
+        return 0, []
+
+    indexed = 0
+    rejected = []
+    items = json_loads(response.content).get('items', [])
+    for (filename, entry), item in zip(batch, items):
+        result = item.get('index', {})
+        if result.get('status') in [200, 201]:
+            indexed += 1
+        elif result.get('status') == 429:
+            rejected.append((filename, entry))
+        else:
+            # Only log errors, not success messages (one line per failed document)
+            LOGGER.error(
+                "Indexing failed for %s: HTTP %s %s",
+                filename,
+                result.get('status'),
+                json.dumps(result.get('error'))
+            )
+    return indexed, rejected
+
+
+def send_bulk_with_retries(batch):
+    """Send a bulk batch, resending the PDFs rejected with HTTP 429 after a growing delay.
+
+    The session's Retry does not cover this: urllib3 never retries a POST.
+    Returns ``(indexed, throttled)``: the number of PDFs indexed and whether any were rejected.
+    """
+    indexed, rejected = send_bulk(batch)
+    throttled = bool(rejected)
+    delay = BULK_RETRY_DELAY
+    for _ in range(BULK_MAX_RETRIES):
+        if not rejected:
+            break
+        LOGGER.warning("%s PDF(s) rejected with HTTP 429, retrying in %ss", len(rejected), delay)
+        time.sleep(delay)
+        delay *= 2
+        sent, rejected = send_bulk(rejected)
+        indexed += sent
+
+    for filename, _ in rejected:
+        LOGGER.error("Indexing failed for %s: HTTP 429 after %s retries", filename, BULK_MAX_RETRIES)
+    return indexed, throttled
+
+
+def timed_send_bulk(batch):
+    """Send a bulk batch; return ``(indexed, throttled, latency_seconds)``."""
+    start = time.monotonic()
+    indexed, throttled = send_bulk_with_retries(batch)
+    return indexed, throttled, time.monotonic() - start
+
+
+def apply_ingest_settings():
+    """Relax refresh and replica settings for ingestion; return the settings to restore."""
+    try:
+        response = session.get(
+            f"{ES_ENDPOINT}/{ES_INDEX}/_settings",
+            headers=headers,
+            params={"flat_settings": "true"}
+        )
+        if response.status_code != 200:
+            print(f"Could not read index settings: HTTP {response.status_code}")
+            return None
+        current = next(iter(json_loads(response.content).values()), {}).get('settings', {})
+        # Settings that were not set explicitly are restored to the cluster default (null)
+        original = {key: current.get(key) for key in INGEST_INDEX_SETTINGS}
+
+        response = session.put(
+            f"{ES_ENDPOINT}/{ES_INDEX}/_settings",
+            headers=headers,
+            json=INGEST_INDEX_SETTINGS
+        )
+        if response.status_code != 200:
+            print(f"Could not update index settings: HTTP {response.status_code}")
+            return None
+        return original
+    except Exception as e:
+        print(f"Could not update index settings: {str(e)}")
+        return None
+
+
+def restore_index_settings(original):
+    """Restore the index settings saved by apply_ingest_settings()."""
+    try:
+        response = session.put(
+            f"{ES_ENDPOINT}/{ES_INDEX}/_settings",
+            headers=headers,
+            json=original
+        )
+        if response.status_code != 200:
+            print(f"Failed to restore index settings: HTTP {response.status_code}")
+
+        # Make the ingested documents searchable right away
+        session.post(f"{ES_ENDPOINT}/{ES_INDEX}/_refresh", headers=headers)
+    except Exception as e:
+        print(f"Failed to restore index settings: {str(e)}")
+
+
+def ingest_pdfs(pdf_path, concurrency=DEFAULT_CONCURRENCY, extract_local=False, batch_docs=None):
+    """Ingest all PDFs from the specified path.
+
+    ``batch_docs`` fixes the number of PDFs per bulk request; by default it adapts to bulk latency.
+    """
+    pdf_files = get_pdf_files(pdf_path)
+
+    if not pdf_files:
+        print("No PDF files to process")
+        return False
+
+    total_files = len(pdf_files)
+    print(f"Processing {total_files} PDF file(s)...")
+
+    success_count = 0
+    unreadable = []
+    batched_count = 0
+    concurrency = max(1, concurrency)
+    if batch_docs:
+        batch_size = BulkBatchSize(batch_docs, minimum=batch_docs, maximum=batch_docs)
+    else:
+        batch_size = BulkBatchSize()
+
+    def complete(pending_batch):
+        nonlocal success_count, batched_count
+        docs, future = pending_batch
+        indexed, throttled, latency = future.result()
+        batch_size.update(latency, throttled)
+        success_count += indexed
+        batched_count += docs
+        processed_count = batched_count + len(unreadable)
+
+        # Update progress
+        percentage = round(processed_count / total_files * 100, 1)
+        progress = f"\r{processed_count} of {total_files} files processed ({percentage}%)"
+        sys.stdout.write(progress)
+        sys.stdout.flush()
+
+    original_settings = apply_ingest_settings()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            # Encode the next batches while earlier ones are indexed, keeping at
+            # most `concurrency` batches (and their base64 payloads) in memory
+            pending = deque()
+            for batch in iter_bulk_batches(pdf_files, unreadable, extract_local, batch_size):
+                pending.append((len(batch), executor.submit(timed_send_bulk, batch)))
+                if len(pending) > concurrency:
+                    complete(pending.popleft())
+            while pending:
+                complete(pending.popleft())
+    finally:
+        if original_settings is not None:
+            restore_index_settings(original_settings)
+
+    failed_count = total_files - success_count
+
+    # Print newline after progress line
+    print()
+    
+    print(f"Indexed {success_count} of {total_files} file(s)")
+    if failed_count > 0:
+        print(f"Failed: {failed_count}")
+    if not batch_docs:
+        print(f"Final bulk batch size: {batch_size.docs} PDF(s) (fix it with --batch-size)")
+
+    return failed_count == 0
+
+
+def verify_ingestion():
+    """Verify documents were ingested successfully."""
+    try:
+        response = session.get(f"{ES_ENDPOINT}/{ES_INDEX}/_count", headers=headers)
+        if response.status_code == 200:
+            count = json_loads(response.content).get('count', 0)
+            print(f"Index '{ES_INDEX}' contains {count} document(s)")
+            return True
+        else:
+            print(f"Could not verify document count")
+            return True
+    except Exception as e:
+        print(f"Could not verify document count: {str(e)}")
+        return True
+
+
+def configure_logging():
+    """Send log records to stdout, next to the progress output."""
+    for logger_name in ["urllib3", "urllib3.connectionpool", "urllib3.util.retry"]:
+        logging.getLogger(logger_name).setLevel(logging.WARNING)
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.handlers[:] = [handler]
+
+
+def main():
+    global ES_ENDPOINT, headers, session, INFERENCE_ENDPOINT
+
+    configure_logging()
+    
+    parser = argparse.ArgumentParser(
+        description='Setup Elasticsearch infrastructure and ingest PDF files',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Setup and ingest PDFs from default location
+  python3 import_contracts.py
+
+  # Setup and ingest PDFs from specific directory
+  python3 import_contracts.py --pdf-path /path/to/pdfs
+
+  # Only setup infrastructure (skip PDF ingestion)
+  python3 import_contracts.py --setup-only
+
+  # Skip setup and only ingest PDFs
+  python3 import_contracts.py --ingest-only
+        """
+    )
+
+    parser.add_argument(
+        '-c', '--config',
+        default=str(DEFAULT_CONFIG_PATH),
+        help=f'Path to Elasticsearch config YAML (default: {DEFAULT_CONFIG_PATH})'
+    )
+    parser.add_argument(
+        '-m', '--mapping',
+        default=str(DEFAULT_MAPPING_PATH),
+        help=f'Path to mappings JSON (default: {DEFAULT_MAPPING_PATH})'
+    )
+    parser.add_argument(
+        '--pdf-path',
+        default='data',
+        help='Path to PDF file or directory containing PDFs (default: data)'
+    )
+    parser.add_argument(
+        '--setup-only',
+        action='store_true',
+        help='Only setup infrastructure (pipeline and index), skip PDF ingestion'
+    )
+    parser.add_argument(
+        '--ingest-only',
+        action='store_true',
+        help='Skip setup, only ingest PDFs (assumes infrastructure exists)'
+    )
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f'Number of bulk requests sent in parallel (default: {DEFAULT_CONCURRENCY})'
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        help=f'PDFs per bulk request (default: adapts to bulk latency, up to {BULK_MAX_DOCS})'
+    )
+    parser.add_argument(
+        '--extract-local',
+        action='store_true',
+        help='Extract PDF text locally with PyPDF2 and send only the text (no base64 upload)'
+    )
+    parser.add_argument(
+        '--inference-endpoint',
+        help='Inference endpoint ID (default: .elser-2-elastic, will auto-detect if not found)'
+    )
+
+    args = parser.parse_args()
+
+    if args.extract_local and PdfReader is None:
+        print("PyPDF2 is required for --extract-local. Install with 'pip install PyPDF2'.")
+        sys.exit(1)
+    
+    # Set inference endpoint if provided
+    if args.inference_endpoint:
+        INFERENCE_ENDPOINT = args.inference_endpoint
+    
+    # Load configuration
+    try:
+        ES_ENDPOINT, headers = load_config(Path(args.config))
+        session = create_session()
+    except Exception as e:
+        print(f"Failed to load config: {e}")
+        sys.exit(1)
+
+    # Load mapping
+    try:
+        mapping = load_json(Path(args.mapping).resolve())
+        validate_mapping(mapping)
+    except Exception as e:
+        print(f"Failed to load mapping: {e}")
+        sys.exit(1)
+
+    # Check Elasticsearch connection
+    if not check_elasticsearch():
+        print("Cannot connect to Elasticsearch. Exiting.")
+        sys.exit(1)
+
+    # Setup phase
+    if not args.ingest_only:
+        # The pipeline does not depend on the inference endpoint or the index,
+        # so it is created while those are checked and set up
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pipeline_created = executor.submit(create_pipeline)
+
+            # Check ELSER endpoint
+            if not check_inference_endpoint():
+                print("ELSER inference endpoint not found!")
+                print("Please deploy ELSER via Kibana or API before continuing.")
+                print("See: Management → Machine Learning → Trained Models → ELSER → Deploy")
+                sys.exit(1)
+
+            # Create index (will delete existing one if present)
+            if not create_index(mapping):
+                print("Failed to create index. Exiting.")
+                sys.exit(1)
+
+            if not pipeline_created.result():
+                print("Failed to create pipeline. Exiting.")
+                sys.exit(1)
+
+    # Ingestion phase
+    if not args.setup_only:
+        start_time = time.time()
+
+        if not ingest_pdfs(args.pdf_path, args.concurrency, args.extract_local, args.batch_size):
+            print("PDF ingestion had errors.")
+            sys.exit(1)
+
+        elapsed_time = time.time() - start_time
+        print(f"Total ingestion time: {elapsed_time:.2f} seconds")
+
+        # Verify ingestion
+        verify_ingestion()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,20 +6,29 @@
 from __future__ import annotations
 
 import argparse
+import contextlib
 import csv
+import fnmatch
+import functools
 import glob
 import gzip
 import io
+import itertools
 import json
 import logging
+import multiprocessing
+import os
+import queue
 import re
-import shlex
-import subprocess
 import sys
+import threading
 import zipfile
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass
+from operator import itemgetter
 from pathlib import Path
-from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
 
 try:
     from elasticsearch import Elasticsearch
@@ -42,18 +51,150 @@ try:
 except ImportError:  # pragma: no cover - handled at runtime
     Elasticsearch = None
 
+try:
+    # Only exported when orjson is installed (elasticsearch>=8.12)
+    from elasticsearch.serializer import OrjsonSerializer
+except ImportError:  # pragma: no cover - handled at runtime
+    OrjsonSerializer = None
+
 try:
     import yaml  # type: ignore
 except ImportError:  # pragma: no cover - handled at runtime
     yaml = None
 
+try:
+    # ISA-L's deflate is a drop-in, several times faster replacement for zlib
+    from isal import igzip as fast_gzip  # type: ignore
+except ImportError:  # pragma: no cover - optional accelerator
+    fast_gzip = gzip
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover - optional accelerator
+    orjson = None
+
+try:
+    import pyarrow  # type: ignore
+    from pyarrow import csv as pyarrow_csv  # type: ignore
+except ImportError:  # pragma: no cover - optional accelerator
+    pyarrow = None
+    pyarrow_csv = None
+
 
 LOGGER = logging.getLogger(__name__)
+T = TypeVar("T")
+GLOB_MAGIC_RE = re.compile(r"[*?[]")
+FILENAME_YEAR_MONTH_RE = re.compile(r"-(\d{4})-(\d{2})$")
+FILENAME_YEAR_RE = re.compile(r"-(\d{4})$")
+DATA_FILE_EXTENSIONS = (".gz", ".csv", ".zip")
 BATCH_SIZE = 500
+MAX_CHUNK_BYTES = 10 * 1024 * 1024
+ARROW_BLOCK_SIZE = 8 * 1024 * 1024
+COUNT_BLOCK_SIZE = 1024 * 1024
+# Airport coordinates are rounded to ~1 m; the source data carries float32 noise
+# (e.g. 37.61899948120117) that only inflates every OriginLocation/DestLocation.
+COORDINATE_DECIMALS = 5
+CONNECTIONS_PER_NODE = 16
+REQUEST_TIMEOUT = 120
+MAX_RETRIES = 3
+# BTS numeric columns repeat a small set of values ("0.00", "-5.00", "1435", ...),
+# so each distinct cell is converted once and then served from a cache.
+CONVERSION_CACHE_SIZE = 64 * 1024
 SCRIPT_DIR = Path(__file__).resolve().parent
 DEFAULT_CONFIG_PATH = SCRIPT_DIR.parent / "config" / "elasticsearch.yml"
 DEFAULT_MAPPING_PATH = SCRIPT_DIR.parent / "config" / "mappings-flights.json"
 
+# Index settings applied while bulk loading; the mapping's own values (or the
+# cluster defaults) are restored once the import finishes.
+INGEST_INDEX_SETTINGS: Dict[str, object] = {
+    "refresh_interval": "30s",
+    "number_of_replicas": 0,
+    "translog.flush_threshold_size": "1gb",
+}
+# Additional settings for --fast-ingest: no refreshes at all and an asynchronous
+# translog (a node crash can lose the last seconds of acknowledged documents).
+FAST_INGEST_INDEX_SETTINGS: Dict[str, object] = {
+    "refresh_interval": "-1",
+    "translog.durability": "async",
+}
+FORCEMERGE_MAX_SEGMENTS = 5
+
+# CSV columns read by the transform; FlightLoader._transform_row unpacks the first seven
+# and reads the rest through the field tables below
+SOURCE_COLUMNS: Tuple[str, ...] = (
+    "@timestamp",
+    "FlightDate",
+    "Reporting_Airline",
+    "Tail_Number",
+    "Flight_Number_Reporting_Airline",
+    "Origin",
+    "Dest",
+    "CRSDepTime",
+    "DepDelay",
+    "TaxiOut",
+    "TaxiIn",
+    "CRSArrTime",
+    "ArrDelay",
+    "Cancelled",
+    "CancellationCode",
+    "Diverted",
+    "ActualElapsedTime",
+    "AirTime",
+    "Flights",
+    "Distance",
+    "CarrierDelay",
+    "WeatherDelay",
+    "NASDelay",
+    "SecurityDelay",
+    "LateAircraftDelay",
+)
+
+# Document field -> SOURCE_COLUMNS position for every value converted with to_integer
+# (times as HHMM, durations and delays in minutes, distance in miles).
+INTEGER_FIELDS: Tuple[Tuple[str, int], ...] = tuple(
+    (field, SOURCE_COLUMNS.index(column))
+    for field, column in (
+        ("CRSDepTimeLocal", "CRSDepTime"),
+        ("DepDelayMin", "DepDelay"),
+        ("TaxiOutMin", "TaxiOut"),
+        ("TaxiInMin", "TaxiIn"),
+        ("CRSArrTimeLocal", "CRSArrTime"),
+        ("ArrDelayMin", "ArrDelay"),
+        ("ActualElapsedTimeMin", "ActualElapsedTime"),
+        ("AirTimeMin", "AirTime"),
+        ("Flights", "Flights"),
+        ("DistanceMiles", "Distance"),
+        ("CarrierDelayMin", "CarrierDelay"),
+        ("WeatherDelayMin", "WeatherDelay"),
+        ("NASDelayMin", "NASDelay"),
+        ("SecurityDelayMin", "SecurityDelay"),
+        ("LateAircraftDelayMin", "LateAircraftDelay"),
+    )
+)
+BOOLEAN_FIELDS: Tuple[Tuple[str, int], ...] = (
+    ("Cancelled", SOURCE_COLUMNS.index("Cancelled")),
+    ("Diverted", SOURCE_COLUMNS.index("Diverted")),
+)
+CANCELLATION_CODE_POSITION = SOURCE_COLUMNS.index("CancellationCode")
+BOOLEAN_CELLS: Dict[Optional[str], bool] = {"0.00": False, "1.00": True, "0": False, "1": True}
+
+# Bulk requests are sent to /{index}/_bulk, so every action line is identical.
+BULK_ACTION_LINE = b'{"index":{}}\n'
+
+if orjson is not None:
+
+    def encode_document_line(doc: Dict[str, object]) -> bytes:
+        """Encode a document as a newline-terminated NDJSON line."""
+        return orjson.dumps(doc, option=orjson.OPT_APPEND_NEWLINE)
+
+else:
+    # Compact, non-ASCII-escaping encoder reused for every document.
+    _encode_document = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+    def encode_document_line(doc: Dict[str, object]) -> bytes:
+        """Encode a document as a newline-terminated NDJSON line."""
+        return (_encode_document(doc) + "\n").encode("utf-8")
+
 
 def load_yaml(path: Path) -> Dict[str, object]:
     if not path.exists():
@@ -135,6 +276,46 @@ class ElasticsearchConfig:
         )
 
 
+def normalize_index_settings(settings: object) -> Dict[str, object]:
+    """Flatten index settings to keys without the 'index.' prefix."""
+    normalized: Dict[str, object] = {}
+    if not isinstance(settings, dict):
+        return normalized
+    for key, value in settings.items():
+        key = str(key)
+        if key == "index" and isinstance(value, dict):
+            normalized.update(normalize_index_settings(value))
+        elif key.startswith("index."):
+            normalized[key[len("index."):]] = value
+        else:
+            normalized[key] = value
+    return normalized
+
+
+def build_row_extractor(header: List[str]) -> Callable[[List[str]], Tuple[str, ...]]:
+    """Specialize row access to a file's header.
+
+    Column positions are resolved once, so each row is reduced to the SOURCE_COLUMNS
+    values with a single itemgetter call instead of building a dict for every row.
+    Columns missing from the header read an empty cell appended after the header's
+    width; short rows are padded and long rows truncated to that width first. Like
+    csv.DictReader, a repeated header name refers to its last column.
+    """
+    positions = {name: position for position, name in enumerate(header)}
+
+    width = len(header)
+    getter = itemgetter(*(positions.get(name, width) for name in SOURCE_COLUMNS))
+    padding = [""] * width
+
+    def extract(row: List[str]) -> Tuple[str, ...]:
+        if len(row) != width:
+            row = row[:width] + padding[len(row):]
+        row.append("")
+        return getter(row)
+
+    return extract
+
+
 def create_elasticsearch_client(config: ElasticsearchConfig) -> Elasticsearch:
     """Create an Elasticsearch client from configuration."""
     if Elasticsearch is None:
@@ -142,11 +323,20 @@ def create_elasticsearch_client(config: ElasticsearchConfig) -> Elasticsearch:
             "Elasticsearch client is required. Install with 'pip install elasticsearch'."
         )
 
-    # Build client configuration
+    # Build client configuration. The client keeps a urllib3 pool of keep-alive
+    # connections per node, so every bulk request after the first one reuses an
+    # already-negotiated TCP/TLS socket instead of paying a new handshake.
+    # Request bodies are gzip-compressed; NDJSON bulk payloads shrink several times.
     client_kwargs: Dict[str, object] = {
         "hosts": [config.endpoint],
         "verify_certs": config.ssl_verify,
         "headers": config.headers,
+        "connections_per_node": CONNECTIONS_PER_NODE,
+        "http_compress": True,
+        "request_timeout": REQUEST_TIMEOUT,
+        # Documents get auto-generated IDs, so timed-out bulk requests are not retried
+        # (the cluster may already have indexed them); connection errors are.
+        "max_retries": MAX_RETRIES,
     }
 
     # Handle authentication
@@ -161,13 +351,18 @@ def create_elasticsearch_client(config: ElasticsearchConfig) -> Elasticsearch:
     elif config.ca_path:
         client_kwargs["ca_certs"] = config.ca_path
 
+    # Decode bulk responses with orjson when it is available
+    if OrjsonSerializer is not None:
+        client_kwargs["serializer"] = OrjsonSerializer()
+
     return Elasticsearch(**client_kwargs)
 
 
 class AirportLookup:
     def __init__(self, airports_file: Optional[Path], logger: logging.Logger):
         self._logger = logger
-        self._airports: Dict[str, Tuple[float, float]] = {}
+        # IATA code -> pre-formatted "lat,lon" geo_point string
+        self._airports: Dict[str, str] = {}
         if airports_file and airports_file.exists():
             self._load_airports(airports_file)
 
@@ -175,19 +370,15 @@ class AirportLookup:
         if not iata_code:
             return None
 
-        airport = self._airports.get(iata_code.upper())
-        if not airport:
-            return None
-
-        lat, lon = airport
-        return f"{lat},{lon}"
+        # BTS codes are already upper case, so the exact lookup almost always hits
+        return self._airports.get(iata_code) or self._airports.get(iata_code.upper())
 
     def _load_airports(self, file_path: Path) -> None:
         self._logger.info("Loading airports from %s", file_path)
         count = 0
 
         try:
-            with gzip.open(file_path, "rt", encoding="utf-8") as handle:
+            with fast_gzip.open(file_path, "rt", encoding="utf-8") as handle:
                 reader = csv.reader(handle)
                 for row in reader:
                     # Columns: ID, Name, City, Country, IATA, ICAO, Lat, Lon, ...
@@ -204,9 +395,9 @@ class AirportLookup:
                         continue
 
                     try:
-                        lat = float(lat_str)
-                        lon = float(lon_str)
-                        self._airports[iata.upper()] = (lat, lon)
+                        lat = round(float(lat_str), COORDINATE_DECIMALS)
+                        lon = round(float(lon_str), COORDINATE_DECIMALS)
+                        self._airports[iata.upper()] = f"{lat},{lon}"
                         count += 1
                     except (ValueError, TypeError):
                         continue
@@ -227,7 +418,7 @@ class CancellationLookup:
         if not code:
             return None
 
-        return self._cancellations.get(code.upper())
+        return self._cancellations.get(code) or self._cancellations.get(code.upper())
 
     def _load_cancellations(self, file_path: Path) -> None:
         self._logger.info("Loading cancellations from %s", file_path)
@@ -258,7 +449,11 @@ class FlightLoader:
         index: str,
         *,
         batch_size: int = BATCH_SIZE,
+        max_chunk_bytes: int = MAX_CHUNK_BYTES,
         refresh: bool = False,
+        workers: int = 1,
+        bulk_threads: int = 1,
+        fast_ingest: bool = False,
         airports_file: Optional[Path] = None,
         cancellations_file: Optional[Path] = None,
     ):
@@ -266,12 +461,38 @@ class FlightLoader:
         self._mapping = mapping
         self._index = index
         self._batch_size = max(1, batch_size)
-        self._refresh = refresh
+        self._max_chunk_bytes = max(1, max_chunk_bytes)
+        # Query parameters shared by every bulk request, built once.
+        # filter_path trims a successful response to {"errors": false} instead of one
+        # result per document; refresh is only sent when requested.
+        self._bulk_params: Dict[str, object] = {"filter_path": "errors,items.*.error"}
+        if refresh:
+            self._bulk_params["refresh"] = True
+        self._workers = max(1, workers)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._bulk_threads = max(1, bulk_threads)
+        self._bulk_executor: Optional[ThreadPoolExecutor] = None
+        self._pending_bulks: deque[Tuple[Future, int]] = deque()
         self._airport_lookup = AirportLookup(airports_file, LOGGER)
         self._cancellation_lookup = CancellationLookup(cancellations_file, LOGGER)
         self._total_records = 0
         self._loaded_records = 0
         self._ensured_indices: set[str] = set()  # Track which indices we've already ensured
+        self._yearly_index_names: Dict[str, str] = {}  # Year -> index name for timestamp routing
+        self._index_settings = normalize_index_settings(mapping.get("settings"))
+        self._fast_ingest = fast_ingest
+        self._ingest_settings = dict(INGEST_INDEX_SETTINGS)
+        if fast_ingest:
+            self._ingest_settings.update(FAST_INGEST_INDEX_SETTINGS)
+
+    def __getstate__(self) -> Dict[str, object]:
+        # Worker processes only transform and serialize rows; they never talk to Elasticsearch
+        state = self.__dict__.copy()
+        state["_client"] = None
+        state["_executor"] = None
+        state["_bulk_executor"] = None
+        state["_pending_bulks"] = deque()
+        return state
 
     def import_files(self, files: Iterable[Path]) -> None:
         file_list = list(files)
@@ -280,8 +501,38 @@ class FlightLoader:
         LOGGER.info("Total records to import: %s", self._format_number(self._total_records))
         LOGGER.info("Importing %s file(s)...", len(file_list))
         
-        for file_path in file_list:
-            self._import_file(file_path)
+        if self._workers > 1:
+            LOGGER.info("Transforming rows with %s worker processes", self._workers)
+            # Workers start from a fresh interpreter instead of being forked from this
+            # process, which by then may be running the prefetch reader thread
+            start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._workers,
+                mp_context=multiprocessing.get_context(start_method),
+                initializer=_init_worker,
+                initargs=(self,),
+            )
+        if self._bulk_threads > 1:
+            LOGGER.info("Sending up to %s bulk requests concurrently", self._bulk_threads)
+            self._bulk_executor = ThreadPoolExecutor(
+                max_workers=self._bulk_threads, thread_name_prefix="bulk"
+            )
+
+        try:
+            for file_path in file_list:
+                self._import_file(file_path)
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+            if self._bulk_executor is not None:
+                self._bulk_executor.shutdown(cancel_futures=True)
+                self._bulk_executor = None
+                self._pending_bulks.clear()
+            self._restore_index_settings()
+
+        if self._fast_ingest:
+            self._forcemerge_indices()
         
         # Print newline after progress line
         sys.stdout.write("\n")
@@ -301,61 +552,152 @@ class FlightLoader:
         LOGGER.info("Importing %s", file_path)
 
         index_buffers: Dict[str, Dict[str, object]] = {}
-        indexed_docs = 0
+        ensured_indices: set[str] = set()
+        loaded_before = self._loaded_records
         processed_rows = 0
+        batch_size = self._batch_size
+        max_chunk_bytes = self._max_chunk_bytes
+
+        blocks = self._iter_blocks(self._iter_rows(file_path))
+        # Close the generators explicitly so that a bulk failure ending the loop early
+        # still stops the prefetch thread and closes the file right away
+        serialized_blocks = self._serialize_blocks(blocks, file_year, file_month)
+        with contextlib.closing(blocks), contextlib.closing(serialized_blocks):
+            for row_count, serialized in serialized_blocks:
+                processed_rows += row_count
+
+                for index_name, entries in serialized.items():
+                    # Indices are created lazily, so files without documents create none
+                    if index_name not in ensured_indices:
+                        self._ensure_index(index_name)
+                        ensured_indices.add(index_name)
+
+                    # NDJSON is written straight into a reusable byte stream per index
+                    buffer = index_buffers.get(index_name)
+                    if buffer is None:
+                        buffer = index_buffers[index_name] = {"stream": io.BytesIO(), "count": 0}
+                    stream = buffer["stream"]
+                    write = stream.write
+                    tell = stream.tell
+                    count = buffer["count"]
+                    for entry in entries:
+                        write(entry)
+                        count += 1
 
-        for row in self._iter_rows(file_path):
-            processed_rows += 1
-            doc = self._transform_row(row)
-            if not doc:
-                continue
+                        # Flush on whichever limit is reached first: document count or payload size
+                        if count >= batch_size or tell() >= max_chunk_bytes:
+                            self._flush(stream, count, index_name)
+                            count = 0
+                    buffer["count"] = count
 
-            timestamp = doc.get("@timestamp")
-            index_name = self._extract_index_name(
-                timestamp, file_year=file_year, file_month=file_month
-            )
+        for index_name, buffer in index_buffers.items():
+            if buffer["count"]:
+                self._flush(buffer["stream"], buffer["count"], index_name)
+        self._drain_bulks()
+
+        LOGGER.info(
+            "Finished %s (rows processed: %s, documents indexed: %s)",
+            file_path,
+            processed_rows,
+            self._loaded_records - loaded_before,
+        )
+
+    def _iter_blocks(
+        self, rows: Iterator[Tuple[str, ...]]
+    ) -> Iterator[Tuple[int, List[Tuple[str, ...]]]]:
+        """Group rows into blocks of batch_size, tagged with the 1-based number of the first row.
+
+        Closing the block generator closes the row generator too, releasing its file.
+        """
+        first_row = 1
+        try:
+            while True:
+                block = list(itertools.islice(rows, self._batch_size))
+                if not block:
+                    return
+                yield first_row, block
+                first_row += len(block)
+        finally:
+            close = getattr(rows, "close", None)
+            if close is not None:
+                close()
+
+    def _serialize_blocks(
+        self,
+        blocks: Iterator[Tuple[int, List[Tuple[str, ...]]]],
+        file_year: Optional[str],
+        file_month: Optional[str],
+    ) -> Iterator[Tuple[int, Dict[str, List[bytes]]]]:
+        """Serialize row blocks in order, in-process or on the worker pool."""
+        if self._executor is None:
+            for first_row, block in blocks:
+                yield len(block), self._serialize_rows(block, first_row, file_year, file_month)
+            return
+
+        # Decompress and parse the file on a reader thread (gzip/ISA-L and the Arrow
+        # reader release the GIL) while this thread feeds the pool and sends bulks.
+        # Keep a bounded number of blocks in flight so large files are never read fully into memory
+        # Closing the prefetch generator explicitly stops and joins the reader thread as
+        # soon as serialization stops early, not whenever the generator is collected
+        pending = deque()
+        with contextlib.closing(prefetch(blocks, self._workers * 2)) as prefetched:
+            for first_row, block in prefetched:
+                future = self._executor.submit(
+                    _serialize_rows_in_worker, block, first_row, file_year, file_month
+                )
+                pending.append((len(block), future))
+                if len(pending) >= self._workers * 2:
+                    row_count, future = pending.popleft()
+                    yield row_count, future.result()
+        while pending:
+            row_count, future = pending.popleft()
+            yield row_count, future.result()
+
+    def _serialize_rows(
+        self,
+        rows: List[Tuple[str, ...]],
+        first_row: int,
+        file_year: Optional[str],
+        file_month: Optional[str],
+    ) -> Dict[str, List[bytes]]:
+        """Transform rows and encode them as bulk entries (action + document line) grouped by target index."""
+        serialized: Dict[str, List[bytes]] = {}
+        # Filename hints name the target index for the whole file (the usual case)
+        static_index_name = self._static_index_name(file_year, file_month)
+        transform_row = self._transform_row
+        extract_index_name = self._extract_index_name
+
+        for row_number, row in enumerate(rows, start=first_row):
+            doc, timestamp = transform_row(row)
+            index_name = static_index_name or extract_index_name(timestamp)
             if not index_name:
+                row = dict(zip(SOURCE_COLUMNS, row))
                 timestamp_raw = row.get("@timestamp") or row.get("FlightDate")
                 LOGGER.warning(
                     "Skipping document - missing or invalid timestamp. Raw value: %s, parsed timestamp: %s. "
                     "Row %s: Origin=%s, Dest=%s, Airline=%s",
                     repr(timestamp_raw),
                     repr(timestamp),
-                    processed_rows,
+                    row_number,
                     row.get("Origin"),
                     row.get("Dest"),
                     row.get("Reporting_Airline"),
                 )
                 continue
 
-            doc = {key: value for key, value in doc.items() if value is not None}
             if not doc:
                 continue
 
-            self._ensure_index(index_name)
-
-            buffer = index_buffers.setdefault(index_name, {"lines": [], "count": 0})
-            buffer["lines"].append(json.dumps({"index": {"_index": index_name}}))
-            buffer["lines"].append(json.dumps(doc, ensure_ascii=False))
-            buffer["count"] += 1
-
-            if buffer["count"] >= self._batch_size:
-                indexed_docs += self._flush(buffer["lines"], index_name)
-                buffer["lines"].clear()
-                buffer["count"] = 0
+            entries = serialized.get(index_name)
+            if entries is None:
+                entries = serialized[index_name] = []
+            entries.append(BULK_ACTION_LINE + encode_document_line(doc))
 
-        for index_name, buffer in index_buffers.items():
-            if buffer["count"]:
-                indexed_docs += self._flush(buffer["lines"], index_name)
-
-        LOGGER.info(
-            "Finished %s (rows processed: %s, documents indexed: %s)",
-            file_path,
-            processed_rows,
-            indexed_docs,
-        )
+        return serialized
 
-    def _iter_rows(self, file_path: Path) -> Iterator[Dict[str, str]]:
+    @contextlib.contextmanager
+    def _open_csv(self, file_path: Path) -> Iterator[io.BufferedIOBase]:
+        """Open the (possibly compressed) CSV data of a file as a binary stream."""
         if file_path.suffix.lower() == ".zip":
             with zipfile.ZipFile(file_path) as archive:
                 entry_name = next(
@@ -364,20 +706,61 @@ class FlightLoader:
                 if entry_name is None:
                     raise RuntimeError(f"No CSV entry found in archive {file_path}")
                 with archive.open(entry_name, "r") as entry:
-                    with io.TextIOWrapper(entry, encoding="utf-8") as text_stream:
-                        reader = csv.DictReader(text_stream)
-                        for row in reader:
-                            yield row
+                    yield entry
         elif file_path.suffix.lower() == ".gz":
-            with gzip.open(file_path, "rt", encoding="utf-8") as handle:
-                reader = csv.DictReader(handle)
-                for row in reader:
-                    yield row
+            with fast_gzip.open(file_path, "rb") as handle:
+                yield handle
         else:
-            with file_path.open("r", encoding="utf-8") as handle:
-                reader = csv.DictReader(handle)
-                for row in reader:
-                    yield row
+            with file_path.open("rb") as handle:
+                yield handle
+
+    def _iter_rows(self, file_path: Path) -> Iterator[Tuple[str, ...]]:
+        """Yield the SOURCE_COLUMNS values of every CSV row in the file."""
+        with self._open_csv(file_path) as stream:
+            yield from self._read_csv(stream)
+
+    def _read_csv(self, stream: io.BufferedIOBase) -> Iterator[Tuple[str, ...]]:
+        if pyarrow_csv is not None:
+            yield from self._read_csv_arrow(stream)
+            return
+
+        with io.TextIOWrapper(stream, encoding="utf-8", newline="") as text_stream:
+            reader = csv.reader(text_stream)
+            header = next(reader, None)
+            if header is None:
+                return
+            # Blank lines parse as empty rows; csv.DictReader skipped them too
+            yield from map(build_row_extractor(header), filter(None, reader))
+
+    def _read_csv_arrow(self, stream: io.BufferedIOBase) -> Iterator[Tuple[str, ...]]:
+        """Parse the CSV with pyarrow's C++ reader and yield rows from its record batches.
+
+        Only the SOURCE_COLUMNS are decoded, all of them as strings, so the rows match
+        what the csv module path produces. Rows with an unexpected number of cells are
+        skipped (the Arrow reader cannot pad them).
+        """
+        if not stream.peek(1):
+            return
+
+        def skip_invalid_row(row: object) -> str:
+            LOGGER.warning("Skipping malformed CSV row %s: %s", row.number, row.text[:200])
+            return "skip"
+
+        reader = pyarrow_csv.open_csv(
+            stream,
+            read_options=pyarrow_csv.ReadOptions(block_size=ARROW_BLOCK_SIZE),
+            parse_options=pyarrow_csv.ParseOptions(invalid_row_handler=skip_invalid_row),
+            convert_options=pyarrow_csv.ConvertOptions(
+                column_types={name: pyarrow.string() for name in SOURCE_COLUMNS},
+                include_columns=list(SOURCE_COLUMNS),
+                include_missing_columns=True,
+                strings_can_be_null=False,
+                quoted_strings_can_be_null=False,
+            ),
+        )
+        for batch in reader:
+            columns = [column.fill_null("").to_pylist() for column in batch.columns]
+            yield from zip(*columns)
 
     def _ensure_index(self, index_name: str) -> None:
         """Ensure an index exists, creating it if necessary. Deletes existing index first."""
@@ -398,10 +781,14 @@ class FlightLoader:
             if "notfound" not in error_str and "404" not in error_str:
                 LOGGER.warning("Failed to delete index '%s': %s", index_name, exc)
         
+        # Create the index with bulk-friendly settings; they are reverted after the import
+        body = dict(self._mapping)
+        body["settings"] = {**self._index_settings, **self._ingest_settings}
+
         LOGGER.info("Creating index: %s", index_name)
         try:
             # Try using body parameter (works for full index definition)
-            self._client.indices.create(index=index_name, body=self._mapping)
+            self._client.indices.create(index=index_name, body=body)
             LOGGER.info("Index '%s' created", index_name)
             LOGGER.info("Successfully created index: %s", index_name)
         except Exception as exc:
@@ -418,17 +805,62 @@ class FlightLoader:
                 raise RuntimeError(f"Index creation failed: {exc}") from exc
         self._ensured_indices.add(index_name)
 
-    def _flush(self, lines: List[str], index_name: str) -> int:
-        # Build NDJSON payload for bulk API
-        payload = ("\n".join(lines) + "\n").encode("utf-8")
-        
+    def _restore_index_settings(self) -> None:
+        """Revert the bulk-load settings on every index created during this run."""
+        # A null value resets a setting to the cluster default
+        settings = {key: self._index_settings.get(key) for key in self._ingest_settings}
+        for index_name in sorted(self._ensured_indices):
+            try:
+                self._client.indices.put_settings(index=index_name, body={"index": settings})
+                LOGGER.debug("Restored settings on index '%s'", index_name)
+            except Exception as exc:
+                LOGGER.warning("Failed to restore settings on index '%s': %s", index_name, exc)
+
+    def _forcemerge_indices(self) -> None:
+        """Start a background force merge of every index loaded during this run."""
+        for index_name in sorted(self._ensured_indices):
+            try:
+                self._client.indices.forcemerge(
+                    index=index_name,
+                    max_num_segments=FORCEMERGE_MAX_SEGMENTS,
+                    wait_for_completion=False,
+                )
+                LOGGER.info("Started force merge of index '%s'", index_name)
+            except Exception as exc:
+                LOGGER.warning("Failed to force merge index '%s': %s", index_name, exc)
+
+    def _flush(self, buffer: io.BytesIO, doc_count: int, index_name: str) -> None:
+        # Take the NDJSON payload and reset the stream so it can be refilled
+        payload = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+        if self._bulk_executor is None:
+            self._send_bulk(payload, index_name)
+            self._record_progress(doc_count)
+            return
+
+        # Keep a bounded number of requests in flight so Elasticsearch indexes one
+        # batch while the next ones are being built and sent
+        future = self._bulk_executor.submit(self._send_bulk, payload, index_name)
+        self._pending_bulks.append((future, doc_count))
+        while len(self._pending_bulks) > self._bulk_threads * 2:
+            self._complete_bulk()
+
+    def _drain_bulks(self) -> None:
+        while self._pending_bulks:
+            self._complete_bulk()
+
+    def _complete_bulk(self) -> None:
+        future, doc_count = self._pending_bulks.popleft()
+        future.result()
+        self._record_progress(doc_count)
+
+    def _send_bulk(self, payload: bytes, index_name: str) -> None:
         try:
             # Use direct bulk API with NDJSON format
             # The client automatically sets Content-Type for bulk operations
-            result = self._client.bulk(
-                body=payload,
-                refresh=self._refresh,
-            )
+            result = self._client.bulk(index=index_name, body=payload, **self._bulk_params)
             
             if result.get("errors"):
                 items = result.get("items", [])
@@ -440,13 +872,12 @@ class FlightLoader:
                 for error in errors[:5]:
                     LOGGER.error("Bulk item error: %s", error)
                 raise RuntimeError("Bulk indexing reported errors; aborting")
-            
-            doc_count = len(lines) // 2
         except Exception as exc:
             raise RuntimeError(f"Bulk request failed: {exc}") from exc
 
+    def _record_progress(self, doc_count: int) -> None:
         self._loaded_records += doc_count
-        
+
         if self._total_records > 0:
             percentage = round(self._loaded_records / self._total_records * 100, 1)
             progress = "\r{} of {} records loaded ({}%)".format(
@@ -459,68 +890,71 @@ class FlightLoader:
         
         sys.stdout.write(progress)
         sys.stdout.flush()
-        
-        return doc_count
 
-    def _transform_row(self, row: Dict[str, str]) -> Dict[str, object]:
+    def _transform_row(self, row: Tuple[str, ...]) -> Tuple[Dict[str, object], Optional[str]]:
+        """Build the document for a row; returns it together with its timestamp."""
+        # SOURCE_COLUMNS starts with the identifying columns
+        (
+            timestamp_value,
+            flight_date_value,
+            reporting_airline_value,
+            tail_number_value,
+            flight_number_value,
+            origin_value,
+            dest_value,
+        ) = row[:7]
+        # Fields without a value are left out of the document entirely
         doc: Dict[str, object] = {}
 
         # Get timestamp - prefer @timestamp column if it exists, otherwise use FlightDate
-        timestamp = present(row.get("@timestamp")) or present(row.get("FlightDate"))
-        doc["@timestamp"] = timestamp
+        timestamp = present(timestamp_value) or present(flight_date_value)
+        if timestamp:
+            doc["@timestamp"] = timestamp
 
         # Flight ID - construct from date, airline, flight number, origin, and destination
         flight_date = timestamp
-        reporting_airline = present(row.get("Reporting_Airline"))
-        flight_number = present(row.get("Flight_Number_Reporting_Airline"))
-        origin = present(row.get("Origin"))
-        dest = present(row.get("Dest"))
+        reporting_airline = present(reporting_airline_value)
+        flight_number = present(flight_number_value)
+        origin = present(origin_value)
+        dest = present(dest_value)
 
         if flight_date and reporting_airline and flight_number and origin and dest:
             doc["FlightID"] = f"{flight_date}_{reporting_airline}_{flight_number}_{origin}_{dest}"
 
         # Direct mappings from CSV to mapping field names
-        doc["Reporting_Airline"] = reporting_airline
-        doc["Tail_Number"] = present(row.get("Tail_Number"))
-        doc["Flight_Number"] = flight_number
-        doc["Origin"] = origin
-        doc["Dest"] = dest
-
-        # Time fields - convert to integers (minutes or time in HHMM format)
-        doc["CRSDepTimeLocal"] = to_integer(row.get("CRSDepTime"))
-        doc["DepDelayMin"] = to_integer(row.get("DepDelay"))
-        doc["TaxiOutMin"] = to_integer(row.get("TaxiOut"))
-        doc["TaxiInMin"] = to_integer(row.get("TaxiIn"))
-        doc["CRSArrTimeLocal"] = to_integer(row.get("CRSArrTime"))
-        doc["ArrDelayMin"] = to_integer(row.get("ArrDelay"))
+        if reporting_airline:
+            doc["Reporting_Airline"] = reporting_airline
+        tail_number = present(tail_number_value)
+        if tail_number:
+            doc["Tail_Number"] = tail_number
+        if flight_number:
+            doc["Flight_Number"] = flight_number
+        if origin:
+            doc["Origin"] = origin
+        if dest:
+            doc["Dest"] = dest
+
+        # Time, duration, count, distance and delay fields as integers
+        for field, position in INTEGER_FIELDS:
+            number = to_integer(row[position])
+            if number is not None:
+                doc[field] = number
 
         # Boolean fields
-        doc["Cancelled"] = to_boolean(row.get("Cancelled"))
-        doc["Diverted"] = to_boolean(row.get("Diverted"))
+        for field, position in BOOLEAN_FIELDS:
+            flag = to_boolean(row[position])
+            if flag is not None:
+                doc[field] = flag
 
         # Cancellation code
-        cancellation_code = present(row.get("CancellationCode"))
-        doc["CancellationCode"] = cancellation_code
+        cancellation_code = present(row[CANCELLATION_CODE_POSITION])
+        if cancellation_code:
+            doc["CancellationCode"] = cancellation_code
 
-        # Cancellation reason - lookup from cancellations data
-        cancellation_reason = self._cancellation_lookup.lookup_reason(cancellation_code)
-        if cancellation_reason:
-            doc["CancellationReason"] = cancellation_reason
-
-        # Time duration fields (convert to minutes as integers)
-        doc["ActualElapsedTimeMin"] = to_integer(row.get("ActualElapsedTime"))
-        doc["AirTimeMin"] = to_integer(row.get("AirTime"))
-
-        # Count and distance
-        doc["Flights"] = to_integer(row.get("Flights"))
-        doc["DistanceMiles"] = to_integer(row.get("Distance"))
-
-        # Delay fields (with Min suffix to match mapping)
-        doc["CarrierDelayMin"] = to_integer(row.get("CarrierDelay"))
-        doc["WeatherDelayMin"] = to_integer(row.get("WeatherDelay"))
-        doc["NASDelayMin"] = to_integer(row.get("NASDelay"))
-        doc["SecurityDelayMin"] = to_integer(row.get("SecurityDelay"))
-        doc["LateAircraftDelayMin"] = to_integer(row.get("LateAircraftDelay"))
+            # Cancellation reason - lookup from cancellations data
+            cancellation_reason = self._cancellation_lookup.lookup_reason(cancellation_code)
+            if cancellation_reason:
+                doc["CancellationReason"] = cancellation_reason
 
         # Geo point fields - lookup from airports data
         origin_location = self._airport_lookup.lookup_coordinates(origin)
@@ -531,44 +965,52 @@ class FlightLoader:
         if dest_location:
             doc["DestLocation"] = dest_location
 
-        return doc
+        return doc, timestamp
 
     def _extract_year_month_from_filename(self, file_path: Path) -> Tuple[Optional[str], Optional[str]]:
         """Extract year and month hints from filename (e.g., flights-2025-07.csv.gz)."""
         basename = file_path.name
-        while True:
-            new_basename = re.sub(r"\.(gz|csv|zip)$", "", basename, flags=re.IGNORECASE)
-            if new_basename == basename:
-                break
-            basename = new_basename
+        while basename.lower().endswith(DATA_FILE_EXTENSIONS):
+            basename = basename.rsplit(".", 1)[0]
 
-        match_year_month = re.search(r"-(\d{4})-(\d{2})$", basename)
+        match_year_month = FILENAME_YEAR_MONTH_RE.search(basename)
         if match_year_month:
             return match_year_month.group(1), match_year_month.group(2)
 
-        match_year = re.search(r"-(\d{4})$", basename)
+        match_year = FILENAME_YEAR_RE.search(basename)
         if match_year:
             return match_year.group(1), None
 
         return None, None
 
-    def _extract_index_name(
-        self, timestamp: Optional[str], *, file_year: Optional[str], file_month: Optional[str]
-    ) -> Optional[str]:
-        """Build index name based on filename hints or timestamp (matches Ruby importer)."""
+    def _static_index_name(self, file_year: Optional[str], file_month: Optional[str]) -> Optional[str]:
+        """Build index name from filename hints (matches Ruby importer)."""
         if file_year and file_month:
             return f"{self._index}-{file_year}-{file_month}"
 
         if file_year:
             return f"{self._index}-{file_year}"
 
+        return None
+
+    def _extract_index_name(self, timestamp: Optional[str]) -> Optional[str]:
+        """Build index name from a YYYY-MM-DD timestamp when the filename has no hints."""
         if not timestamp:
             return None
 
-        match = re.match(r"^(\d{4})-(\d{2})-\d{2}", timestamp)
-        if match:
-            year = match.group(1)
-            return f"{self._index}-{year}"
+        if (
+            len(timestamp) >= 10
+            and timestamp[4] == "-"
+            and timestamp[7] == "-"
+            and timestamp[:4].isdigit()
+            and timestamp[5:7].isdigit()
+            and timestamp[8:10].isdigit()
+        ):
+            year = timestamp[:4]
+            index_name = self._yearly_index_names.get(year)
+            if index_name is None:
+                index_name = self._yearly_index_names[year] = f"{self._index}-{year}"
+            return index_name
 
         LOGGER.warning("Unable to parse timestamp format: %s", timestamp)
         return None
@@ -578,7 +1020,7 @@ class FlightLoader:
         return f"{number:,}"
 
     def _count_total_records_fast(self, files: List[Path]) -> int:
-        """Count total records across all files using fast shell commands."""
+        """Count total records across all files."""
         total = 0
         for file_path in files:
             if not file_path.is_file():
@@ -589,53 +1031,92 @@ class FlightLoader:
         return total
 
     def _count_lines_fast(self, file_path: Path) -> int:
-        """Count lines in a file using fast shell commands."""
+        """Count newlines in a file's CSV data by reading it in large binary blocks."""
+        lines = 0
         try:
-            if file_path.suffix.lower() == ".zip":
-                with zipfile.ZipFile(file_path) as archive:
-                    entry_name = next(
-                        (name for name in archive.namelist() if name.lower().endswith(".csv")), None
-                    )
-                    if entry_name is None:
-                        return 0
-                    # Use unzip -p to extract and pipe to wc -l
-                    cmd = f'unzip -p {shlex.quote(str(file_path))} {shlex.quote(entry_name)} | wc -l'
-                    result = subprocess.run(
-                        cmd, shell=True, capture_output=True, text=True, check=False
-                    )
-                    if result.returncode != 0:
-                        LOGGER.warning("Failed to count lines in %s: %s", file_path, result.stderr)
-                        return 0
-                    return int(result.stdout.strip())
-            elif file_path.suffix.lower() == ".gz" or str(file_path).lower().endswith(".gz"):
-                # Use gunzip -c for gzip files
-                cmd = f'gunzip -c {shlex.quote(str(file_path))} | wc -l'
-                result = subprocess.run(
-                    cmd, shell=True, capture_output=True, text=True, check=False
-                )
-                if result.returncode != 0:
-                    LOGGER.warning("Failed to count lines in %s: %s", file_path, result.stderr)
-                    return 0
-                return int(result.stdout.strip())
-            else:
-                # Use wc -l for regular files
-                result = subprocess.run(
-                    ["wc", "-l", str(file_path)], capture_output=True, text=True, check=False
-                )
-                if result.returncode != 0:
-                    LOGGER.warning("Failed to count lines in %s: %s", file_path, result.stderr)
-                    return 0
-                return int(result.stdout.split()[0])
+            with self._open_csv(file_path) as stream:
+                read = stream.read
+                block = read(COUNT_BLOCK_SIZE)
+                while block:
+                    lines += block.count(b"\n")
+                    block = read(COUNT_BLOCK_SIZE)
         except Exception as exc:
             LOGGER.warning("Failed to count lines in %s: %s", file_path, exc)
             return 0
+        return lines
+
+
+# Loader copy installed in each worker process by the ProcessPoolExecutor initializer
+_WORKER_LOADER: Optional[FlightLoader] = None
+
+
+def _init_worker(loader: FlightLoader) -> None:
+    global _WORKER_LOADER
+    _WORKER_LOADER = loader
+    # Spawned workers do not inherit the parent's logging setup
+    configure_logging()
+
+
+def _serialize_rows_in_worker(
+    rows: List[Tuple[str, ...]],
+    first_row: int,
+    file_year: Optional[str],
+    file_month: Optional[str],
+) -> Dict[str, List[bytes]]:
+    return _WORKER_LOADER._serialize_rows(rows, first_row, file_year, file_month)
+
+
+_PREFETCH_END = object()
+
+
+def prefetch(items: Iterable[T], depth: int) -> Iterator[T]:
+    """Consume an iterable on a background thread, staying at most depth items ahead."""
+    buffered: queue.Queue = queue.Queue(maxsize=max(1, depth))
+    stopped = threading.Event()
+
+    def put(entry: Tuple[object, Optional[BaseException]]) -> bool:
+        # Give up once the consumer has gone away instead of blocking on a full queue
+        while not stopped.is_set():
+            try:
+                buffered.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        iterator = iter(items)
+        try:
+            for item in iterator:
+                if not put((item, None)):
+                    return
+            put((_PREFETCH_END, None))
+        except BaseException as exc:
+            put((_PREFETCH_END, exc))
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    thread = threading.Thread(target=produce, name="prefetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = buffered.get()
+            if item is _PREFETCH_END:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stopped.set()
+        thread.join()
 
 
 def present(value: Optional[str]) -> Optional[str]:
-    if value is None:
+    if not value:
         return None
-    text = str(value).strip()
-    return text or None
+    return value.strip() or None
 
 
 def to_float(value: Optional[str]) -> Optional[float]:
@@ -648,6 +1129,7 @@ def to_float(value: Optional[str]) -> Optional[float]:
         return None
 
 
+@functools.lru_cache(maxsize=CONVERSION_CACHE_SIZE)
 def to_integer(value: Optional[str]) -> Optional[int]:
     number = to_float(value)
     if number is None:
@@ -656,6 +1138,11 @@ def to_integer(value: Optional[str]) -> Optional[int]:
 
 
 def to_boolean(value: Optional[str]) -> Optional[bool]:
+    # BTS flag columns only contain "0.00"/"1.00"; answer those without parsing
+    known = BOOLEAN_CELLS.get(value)
+    if known is not None:
+        return known
+
     text = present(value)
     if text is None:
         return None
@@ -673,6 +1160,32 @@ def to_boolean(value: Optional[str]) -> Optional[bool]:
     return numeric > 0
 
 
+def expand_glob(pattern: str) -> List[str]:
+    """Expand a glob pattern, scanning only the literal directory in front of the wildcards.
+
+    Patterns such as data/On_Time_*2019*.zip only list data/ and match file names with
+    fnmatch. Patterns with wildcards in directory components (including **) are
+    delegated to glob.glob.
+    """
+    directory, name_pattern = os.path.split(pattern)
+    if "**" in pattern or GLOB_MAGIC_RE.search(directory):
+        return glob.glob(pattern)
+    if not GLOB_MAGIC_RE.search(name_pattern):
+        return [pattern] if os.path.lexists(pattern) else []
+
+    include_hidden = name_pattern.startswith(".")
+    try:
+        with os.scandir(directory or os.curdir) as entries:
+            return [
+                os.path.join(directory, entry.name)
+                for entry in entries
+                if (include_hidden or not entry.name.startswith("."))
+                and fnmatch.fnmatch(entry.name, name_pattern)
+            ]
+    except OSError:
+        return []
+
+
 def files_to_process(data_dir: Path, target_file: Optional[str], load_all: bool, glob_pattern: Optional[str]) -> List[Path]:
     if target_file:
         resolved = resolve_file_path(Path(target_file), data_dir)
@@ -683,14 +1196,14 @@ def files_to_process(data_dir: Path, target_file: Optional[str], load_all: bool,
         pattern_path = Path(glob_pattern)
         if pattern_path.is_absolute():
             # For absolute paths, use glob module directly
-            matched_files = glob.glob(str(pattern_path))
+            matched_files = expand_glob(str(pattern_path))
         else:
             # Try the pattern as-is first (in case it's relative to current directory)
-            matched_files = glob.glob(glob_pattern)
+            matched_files = expand_glob(glob_pattern)
             if not matched_files:
                 # If no matches, try relative to data_dir
                 expanded_pattern = data_dir / glob_pattern
-                matched_files = glob.glob(str(expanded_pattern))
+                matched_files = expand_glob(str(expanded_pattern))
         
         files = sorted([Path(f) for f in matched_files if Path(f).is_file()])
         if not files:
@@ -763,7 +1276,30 @@ def parse_args(argv: List[str]) -> argparse.Namespace:
         default=BATCH_SIZE,
         help=f"Number of documents per bulk request (default: {BATCH_SIZE})",
     )
+    parser.add_argument(
+        "--max-chunk-bytes",
+        type=int,
+        default=MAX_CHUNK_BYTES,
+        help=f"Maximum payload size in bytes per bulk request (default: {MAX_CHUNK_BYTES})",
+    )
     parser.add_argument("--refresh", action="store_true", help="Request an index refresh after each bulk request")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes used to transform and serialize rows (default: 1, in-process)",
+    )
+    parser.add_argument(
+        "--bulk-threads",
+        type=int,
+        default=1,
+        help="Number of bulk requests sent to Elasticsearch concurrently (default: 1)",
+    )
+    parser.add_argument(
+        "--fast-ingest",
+        action="store_true",
+        help="Disable refresh and use an async translog while loading, then force merge the indices",
+    )
     parser.add_argument("--status", action="store_true", help="Test connection and print cluster health status")
     parser.add_argument("--delete-index", action="store_true", help="Delete the target index and exit")
     parser.add_argument("--airports", help="Path to airports.csv.gz file for geo-coordinate lookup")
@@ -913,7 +1449,11 @@ def main(argv: List[str]) -> None:
         mapping=mapping,
         index=args.index,
         batch_size=args.batch_size,
+        max_chunk_bytes=args.max_chunk_bytes,
         refresh=args.refresh,
+        workers=args.workers,
+        bulk_threads=args.bulk_threads,
+        fast_ingest=args.fast_ingest,
         airports_file=airports_file,
         cancellations_file=cancellations_file,
     )
@@ -3,22 +3,48 @@
 
 """AIR Search - Flask web app for searching flights, airlines, and contracts indices with Keyword, Semantic, and AI Agent search."""
 
+import base64
+import functools
+import hashlib
+import heapq
+import itertools
 import json
 import logging
 import os
-import ssl
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Optional
-from urllib import error as urllib_error
+from typing import Dict, List, NamedTuple, Optional, Union
 from urllib import parse as urllib_parse
-from urllib import request as urllib_request
 
 import requests
 import yaml
-from flask import Flask, Response, jsonify, request, stream_with_context
+from requests.adapters import HTTPAdapter
+from flask import Flask, Response, copy_current_request_context, has_request_context, jsonify, request, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, used by jsonify() and request.get_json()."""
+
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 app = Flask(__name__, static_folder='static', static_url_path='')
+if orjson is not None:
+    app.json = OrjsonProvider(app)
 CORS(app)
 
 LOGGER = logging.getLogger(__name__)
@@ -26,9 +52,231 @@ LOGGER = logging.getLogger(__name__)
 # Project root directory (parent of website/)
 PROJECT_ROOT = Path(__file__).parent.parent
 
+# libyaml's C loader when PyYAML was built with it; same safe subset as yaml.safe_load
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# (connect, read) timeouts for Elasticsearch calls; semantic queries may wait on ELSER inference
+ES_REQUEST_TIMEOUT = (3, 60)
+
+
+def create_session() -> requests.Session:
+    """Create an HTTP session whose connections are kept alive and shared by all request threads."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+ES_SESSION = create_session()
+KIBANA_SESSION = create_session()
+
+# Identical read-only requests within ES_CACHE_TTL seconds are answered from memory
+ES_CACHE_TTL = 30
+ES_CACHE_SIZE = 512
+ES_CACHEABLE_ENDPOINTS = ('/_search', '/_msearch', '/_count', '/_query')
+
+
+class ResponseCache:
+    """Thread-safe LRU cache of raw response bodies that expire after a fixed TTL."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key) -> Optional[bytes]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, content = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return content
+
+    def put(self, key, content: bytes) -> None:
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, content)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+
+# Raw bytes are cached (not parsed dicts) because callers modify the responses they get
+ES_RESPONSE_CACHE = ResponseCache(ES_CACHE_SIZE, ES_CACHE_TTL)
+
+# Cacheable requests currently being sent, by cache key. An identical request that
+# arrives meanwhile waits for the same response instead of sending its own
+ES_INFLIGHT: Dict[tuple, Future] = {}
+ES_INFLIGHT_LOCK = threading.Lock()
+
+# Parts of a search response that the app and UI read; Elasticsearch drops the
+# rest (_shards, took, max_score, ...) before sending it
+SEARCH_FILTER_PATH = ','.join([
+    'hits.total',           # count, and relation for the '+' on lower-bound totals
+    'hits.hits._index',     # result type of each hit
+    'hits.hits._id',
+    'hits.hits._score',     # merge order of 'all' searches
+    'hits.hits._source',
+    'hits.hits.fields',     # _inference_fields for semantic highlight terms
+    'hits.hits.highlight',
+    'aggregations',         # facets
+    'error',                # failures, so missing indices can still be recognised
+    'status',
+])
+MSEARCH_FILTER_PATH = ','.join(f'responses.{field}' for field in SEARCH_FILTER_PATH.split(','))
+
+# Cleared the first time the cluster rejects the RRF rank clause (older versions
+# or a license without RRF), so later hybrid searches don't retry it
+RRF_SUPPORTED = True
+
+# Threads that run the per-index searches of an 'all' search concurrently
+SEARCH_EXECUTOR = ThreadPoolExecutor(max_workers=12, thread_name_prefix='search')
+
+# Static parts of the search request bodies, shared by every request instead of
+# being rebuilt per call. Request builders only replace top-level keys, so these
+# nested objects must not be modified.
+FLIGHT_SOURCE = {
+    "includes": [
+        "FlightID", "Reporting_Airline", "Flight_Number", "Origin", "Dest",
+        "CRSDepTimeLocal", "CRSArrTimeLocal", "DepDelayMin", "ArrDelayMin",
+        "Cancelled", "Diverted", "DistanceMiles", "@timestamp"
+    ]
+}
+
+FLIGHT_AGGS = {
+    "cancelled": {
+        "terms": {"field": "Cancelled", "size": 2}
+    },
+    "diverted": {
+        "terms": {"field": "Diverted", "size": 2}
+    },
+    "airlines": {
+        "terms": {"field": "Reporting_Airline", "size": 20, "order": {"_count": "desc"}}
+    },
+    "origins": {
+        "terms": {"field": "Origin", "size": 20, "order": {"_count": "desc"}}
+    },
+    "destinations": {
+        "terms": {"field": "Dest", "size": 20, "order": {"_count": "desc"}}
+    },
+    "flight_dates": {
+        "date_histogram": {
+            "field": "@timestamp",
+            "calendar_interval": "day",
+            "format": "yyyy-MM-dd",
+            "order": {"_key": "desc"}
+        }
+    }
+}
+
+# Flight fields matched by the free-text query (ES|QL LIKE and the count's multi_match)
+FLIGHT_QUERY_FIELDS = ["Flight_Number", "Reporting_Airline", "Origin", "Dest"]
+
+AIRLINE_SOURCE = {
+    "includes": ["Reporting_Airline", "Airline_Name"]
+}
+
+AIRLINE_AGGS = {
+    "airline_codes": {
+        "terms": {"field": "Reporting_Airline", "size": 50, "order": {"_key": "asc"}}
+    }
+}
+
+CONTRACT_SOURCE = {
+    "includes": ["filename", "attachment.title", "upload_date", "attachment.author", "attachment.description", "airline"],
+    "excludes": ["attachment.content", "content"]
+}
+
+CONTRACT_AGGS = {
+    "authors": {
+        "terms": {"field": "attachment.author.keyword", "size": 20, "order": {"_count": "desc"}}
+    },
+    "upload_years": {
+        "date_histogram": {
+            "field": "upload_date",
+            "calendar_interval": "year",
+            "format": "yyyy",
+            "order": {"_key": "desc"}
+        }
+    }
+}
+
+FLIGHT_HIGHLIGHT = {
+    "fields": {
+        "Flight_Number": {},
+        "Reporting_Airline": {},
+        "Origin": {},
+        "Dest": {}
+    }
+}
+
+AIRLINE_SEMANTIC_HIGHLIGHT = {
+    "fields": {
+        "Airline_Name.semantic": {
+            "type": "semantic",
+            "number_of_fragments": 1,
+            "fragment_size": 200
+        }
+    }
+}
+
+AIRLINE_KEYWORD_HIGHLIGHT = {
+    "fields": {
+        "Airline_Name.text": {},
+        "Reporting_Airline": {}
+    }
+}
+
+CONTRACT_KEYWORD_HIGHLIGHT = {
+    "fields": {
+        "attachment.content": {
+            "fragment_size": 350,
+            "number_of_fragments": 5
+        }
+    }
+}
+
+CONTRACT_SEMANTIC_HIGHLIGHT = {
+    "fields": {
+        "semantic_content": {
+            "type": "semantic",
+            "number_of_fragments": 1,
+            "fragment_size": 10
+        },
+        "attachment.content": {
+            "fragment_size": 10,
+            "number_of_fragments": 1
+        },
+        "attachment.title": {},
+        "attachment.description": {
+            "fragment_size": 10,
+            "number_of_fragments": 1
+        }
+    }
+}
+
+CONTRACT_HYBRID_HIGHLIGHT = {
+    "fields": {
+        "attachment.content": {
+            "fragment_size": 200,
+            "number_of_fragments": 3
+        },
+        "attachment.title": {},
+        "attachment.description": {
+            "fragment_size": 150,
+            "number_of_fragments": 2
+        }
+    }
+}
 
-def load_config(config_path: Optional[Path] = None) -> Dict[str, object]:
-    """Load Elasticsearch configuration from YAML file."""
+
+def resolve_config_path(config_path: Optional[Path] = None) -> Path:
+    """Return the config file to use, falling back to the sample config."""
     if config_path is None:
         config_path = PROJECT_ROOT / 'config' / 'elasticsearch.yml'
     
@@ -38,9 +286,14 @@ def load_config(config_path: Optional[Path] = None) -> Dict[str, object]:
     
     if not config_path.exists():
         raise FileNotFoundError(f"Config file not found: {config_path}")
-    
+    return config_path
+
+
+@functools.lru_cache(maxsize=4)
+def parse_config_file(config_path: Path, mtime_ns: int) -> Dict[str, object]:
+    """Parse a YAML config file; cached per (path, modification time)."""
     with config_path.open('r', encoding='utf-8') as handle:
-        data = yaml.safe_load(handle) or {}
+        data = yaml.load(handle, Loader=YAML_LOADER) or {}
     
     if not isinstance(data, dict):
         raise ValueError(f"Configuration must be a mapping (found {type(data).__name__})")
@@ -56,16 +309,53 @@ def build_auth_header(config: Dict[str, object]) -> str:
     user = config.get('user')
     password = config.get('password')
     if user and password:
-        import base64
         credentials = base64.b64encode(f'{user}:{password}'.encode()).decode()
         return f'Basic {credentials}'
     
     return ''
 
 
-def make_es_request(method: str, path: str, body: Optional[Dict] = None) -> Dict:
-    """Make a request to Elasticsearch."""
-    config = load_config()
+def dumps_json(value) -> bytes:
+    """Serialize a value to compact JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+
+def loads_json(content: Union[bytes, str]):
+    """Parse JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+class SearchResponseError(Exception):
+    """Error reported for one of the searches in an _msearch response."""
+
+    def __init__(self, index: str, error: Dict):
+        self.index = index
+        self.error = error
+        super().__init__(f"Elasticsearch error searching {index}: {error.get('reason', error.get('type', error))}")
+
+
+class EsConnection(NamedTuple):
+    """Connection details derived from the config, shared by every Elasticsearch or Kibana request."""
+    base_url: str
+    base_path: str
+    headers: Dict[str, str]
+    ssl_verify: Union[bool, str]
+
+
+def get_es_connection() -> EsConnection:
+    """Return the Elasticsearch connection details for the current config file."""
+    config_path = resolve_config_path()
+    return build_es_connection(config_path, config_path.stat().st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=4)
+def build_es_connection(config_path: Path, mtime_ns: int) -> EsConnection:
+    """Parse the endpoint and build the headers once per (config path, modification time)."""
+    config = parse_config_file(config_path, mtime_ns)
     endpoint = str(config.get('endpoint', '')).strip()
     if not endpoint:
         raise ValueError("Elasticsearch endpoint not configured")
@@ -74,8 +364,6 @@ def make_es_request(method: str, path: str, body: Optional[Dict] = None) -> Dict
     parsed = urllib_parse.urlparse(endpoint)
     base_url = f"{parsed.scheme}://{parsed.netloc}"
     base_path = parsed.path.rstrip('/') if parsed.path else ''
-    full_path = f"{base_path}/{path.lstrip('/')}"
-    url = f"{base_url}{full_path}"
     
     # Build headers
     headers = {
@@ -91,46 +379,145 @@ def make_es_request(method: str, path: str, body: Optional[Dict] = None) -> Dict
     auth_header = build_auth_header(config)
     if auth_header:
         headers['Authorization'] = auth_header
+
+    ssl_verify = config.get('ssl_verify', True)
+    if isinstance(ssl_verify, str):
+        ssl_verify = ssl_verify.lower() not in ('false', '0', 'no', 'n')
+
+    return EsConnection(base_url, base_path, headers, ssl_verify)
+
+
+def make_es_request(method: str, path: str, body: Optional[Dict] = None, ndjson: Optional[List[Dict]] = None, filter_path: Optional[str] = None) -> Dict:
+    """Make a request to Elasticsearch.
+
+    ``ndjson`` sends a list of objects as newline-delimited JSON (for _msearch) instead of ``body``.
+    ``filter_path`` limits the response to the given comma-separated fields.
+
+    Searches are sent with the current client's preference, but cached and coalesced
+    without it: the preference only picks which shard copies answer, so the same
+    search from different clients shares one cache entry and one in-flight request.
+    """
+    connection = get_es_connection()
+    full_path = f"{connection.base_path}/{path.lstrip('/')}"
+    url = f"{connection.base_url}{full_path}"
+    params = {}
+    if filter_path:
+        params['filter_path'] = filter_path
+    if params:
+        url = f"{url}?{urllib_parse.urlencode(params)}"
+    headers = connection.headers
     
     # Log the request in Kibana Dev Tools format (only for _search and _query endpoints)
-    # Extract just the path and index from the full URL
+    # Extract just the path and index from the full URL. The level is checked first so
+    # the bodies are not pretty-printed when INFO logging is off
     request_path = full_path
-    if body and ('/_search' in request_path or '/_query' in request_path):
+    log_requests = LOGGER.isEnabledFor(logging.INFO)
+    if log_requests and body and ('/_search' in request_path or '/_query' in request_path):
         LOGGER.info(f"\n{'='*80}\nKibana Dev Tools Format:\n{'='*80}\n{method} {request_path}\n{json.dumps(body, indent=2)}\n{'='*80}")
 
-    # Build request
-    if body:
-        data = json.dumps(body).encode('utf-8')
-        req = urllib_request.Request(url, data=data, headers=headers, method=method)
+    if ndjson is not None:
+        headers = {**headers, 'Content-Type': 'application/x-ndjson'}
+        data = b''.join(dumps_json(line) + b'\n' for line in ndjson)
+        if log_requests:
+            LOGGER.info(f"\n{'='*80}\nKibana Dev Tools Format:\n{'='*80}\n{method} {request_path}\n{data.decode('utf-8')}{'='*80}")
     else:
-        req = urllib_request.Request(url, headers=headers, method=method)
-
-    # SSL context
-    ssl_verify = config.get('ssl_verify', True)
-    if isinstance(ssl_verify, str):
-        ssl_verify = ssl_verify.lower() not in ('false', '0', 'no', 'n')
-
-    context = None
-    if parsed.scheme == 'https' and not ssl_verify:
-        context = ssl.create_default_context()
-        context.check_hostname = False
-        context.verify_mode = ssl.CERT_NONE
+        data = dumps_json(body) if body else None
+
+    cache_key = None
+    leader = None
+    if method == 'POST' and full_path.endswith(ES_CACHEABLE_ENDPOINTS):
+        cache_key = (url, data, headers.get('Authorization'))
+        cached = ES_RESPONSE_CACHE.get(cache_key)
+        if cached is not None:
+            return loads_json(cached)
+        with ES_INFLIGHT_LOCK:
+            pending = ES_INFLIGHT.get(cache_key)
+            if pending is None:
+                leader = ES_INFLIGHT[cache_key] = Future()
+        if pending is not None:
+            return loads_json(pending.result())
+
+    request_url = url
+    preference = search_preference()
+    if preference and full_path.endswith('/_search'):
+        request_url = f"{url}{'&' if params else '?'}{urllib_parse.urlencode({'preference': preference})}"
+    elif preference and full_path.endswith('/_msearch'):
+        # Every other line of an _msearch body is a search header
+        data = b''.join(
+            dumps_json({**line, 'preference': preference} if position % 2 == 0 else line) + b'\n'
+            for position, line in enumerate(ndjson)
+        )
 
     try:
-        with urllib_request.urlopen(req, context=context) as response:
-            return json.loads(response.read().decode('utf-8'))
-    except urllib_error.HTTPError as e:
-        error_body = e.read().decode('utf-8') if e.fp else 'No error details'
-        LOGGER.error(f"Elasticsearch error: {e.code} {e.reason} - {error_body}")
+        response = ES_SESSION.request(
+            method,
+            request_url,
+            data=data,
+            headers=headers,
+            verify=connection.ssl_verify,
+            timeout=ES_REQUEST_TIMEOUT
+        )
+        response.raise_for_status()
+        result = loads_json(response.content)
+        if cache_key is not None:
+            ES_RESPONSE_CACHE.put(cache_key, response.content)
+        if leader is not None:
+            leader.set_result(response.content)
+        return result
+    except requests.exceptions.HTTPError as e:
+        error_body = e.response.text or 'No error details'
+        LOGGER.error(f"Elasticsearch error: {e.response.status_code} {e.response.reason} - {error_body}")
+        if leader is not None:
+            leader.set_exception(e)
         raise
     except Exception as e:
         LOGGER.error(f"Request error: {e}")
+        if leader is not None:
+            leader.set_exception(e)
         raise
+    finally:
+        if leader is not None:
+            with ES_INFLIGHT_LOCK:
+                del ES_INFLIGHT[cache_key]
+            # Waiting requests must not block if the request was interrupted
+            leader.cancel()
 
 
-def make_kibana_request(method: str, path: str, body: Optional[Dict] = None, stream: bool = False):
-    """Make a request to Kibana."""
-    config = load_config()
+def search_preference() -> Optional[str]:
+    """Return a per-client search preference for the current Flask request.
+
+    Routing a client's searches to the same shard copies keeps their caches warm.
+    The address is hashed so it does not show up in Elasticsearch logs.
+    """
+    if not has_request_context() or not request.remote_addr:
+        return None
+    return hashlib.sha1(request.remote_addr.encode('utf-8')).hexdigest()[:16]
+
+
+def make_es_msearch(searches: Dict[str, Dict]) -> Dict[str, Dict]:
+    """Run one search per index with a single _msearch request.
+
+    Returns each index's response; a failed search has an 'error' object instead of hits.
+    """
+    ndjson = []
+    for index, body in searches.items():
+        ndjson.append({'index': index})
+        ndjson.append(body)
+
+    result = make_es_request('POST', '/_msearch', ndjson=ndjson, filter_path=MSEARCH_FILTER_PATH)
+    return dict(zip(searches, result.get('responses', [])))
+
+
+def get_kibana_connection() -> EsConnection:
+    """Return the Kibana connection details for the current config file."""
+    config_path = resolve_config_path()
+    return build_kibana_connection(config_path, config_path.stat().st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=4)
+def build_kibana_connection(config_path: Path, mtime_ns: int) -> EsConnection:
+    """Resolve the Kibana endpoint and build its headers once per (config path, modification time)."""
+    config = parse_config_file(config_path, mtime_ns)
 
     raw_endpoint = str(config.get('kibana_endpoint', '')).strip()
     kibana_config = config.get('kibana')
@@ -164,8 +551,6 @@ def make_kibana_request(method: str, path: str, body: Optional[Dict] = None, str
 
     base_url = f"{parsed.scheme}://{parsed.netloc}"
     base_path = parsed.path.rstrip('/') if parsed.path else ''
-    full_path = f"{base_path}/{path.lstrip('/')}"
-    url = f"{base_url}{full_path}"
     
     # Build headers
     headers = {
@@ -181,13 +566,6 @@ def make_kibana_request(method: str, path: str, body: Optional[Dict] = None, str
     if auth_header:
         headers['Authorization'] = auth_header
 
-    # Build request
-    data = json.dumps(body).encode('utf-8') if body else None
-    
-    LOGGER.info(f"Kibana request: {method} {url}")
-    LOGGER.info(f"Kibana request headers: {headers}")
-    LOGGER.info(f"Kibana request body: {data}")
-
     verify_setting = config.get('kibana_ssl_verify', config.get('ssl_verify', True))
     if isinstance(verify_setting, str):
         lowered = verify_setting.lower()
@@ -196,14 +574,33 @@ def make_kibana_request(method: str, path: str, body: Optional[Dict] = None, str
         elif lowered in ('true', '1', 'yes', 'y'):
             verify_setting = True
 
+    return EsConnection(base_url, base_path, headers, verify_setting)
+
+
+def make_kibana_request(method: str, path: str, body: Optional[Dict] = None, stream: bool = False):
+    """Make a request to Kibana."""
+    connection = get_kibana_connection()
+    url = f"{connection.base_url}{connection.base_path}/{path.lstrip('/')}"
+    headers = connection.headers
+
+    # Build request
+    data = dumps_json(body) if body else None
+    
+    if LOGGER.isEnabledFor(logging.INFO):
+        LOGGER.info(f"Kibana request: {method} {url}")
+        # The Authorization header carries the API key or password, so it is not logged
+        logged_headers = {name: value for name, value in headers.items() if name.lower() != 'authorization'}
+        LOGGER.info(f"Kibana request headers: {logged_headers}")
+        LOGGER.info(f"Kibana request body: {data}")
+
     try:
-        response = requests.request(
+        response = KIBANA_SESSION.request(
             method,
             url,
             data=data,
             headers=headers,
             stream=stream,
-            verify=verify_setting
+            verify=connection.ssl_verify
         )
         response.raise_for_status()
         return response
@@ -236,6 +633,7 @@ def search():
     query = data.get('query', '').strip()
     index_name = data.get('index', 'all')  # 'all', 'flights', 'airlines', or 'contracts'
     filters = data.get('filters', {})  # Extract filters from request
+    highlight = bool(data.get('highlight', True))  # Callers that don't render snippets can skip highlighting
     
     try:
         # When no query, load 10 documents
@@ -243,20 +641,20 @@ def search():
         
         if index_name == 'all':
             # Search all indices and combine results
-            results = search_all_indices(query, search_type, size, filters)
+            results = search_all_indices(query, search_type, size, filters, highlight)
         elif index_name == 'flights':
-            results = search_flights(query, search_type, size, filters)
+            results = search_flights(query, search_type, size, filters, highlight)
         elif index_name == 'airlines':
-            results = search_airlines(query, search_type, size, filters)
+            results = search_airlines(query, search_type, size, filters, highlight)
         elif index_name == 'contracts':
-            results = search_contracts(query, search_type, size, filters)
+            results = search_contracts(query, search_type, size, filters, highlight)
         else:
             return jsonify({'error': f'Unknown index: {index_name}'}), 400
         
         return jsonify(results)
-    except urllib_error.HTTPError as e:
-        error_body = e.read().decode('utf-8') if hasattr(e, 'read') else str(e)
-        LOGGER.error(f"Elasticsearch HTTP error: {e.code} - {error_body}")
+    except requests.exceptions.HTTPError as e:
+        error_body = e.response.text
+        LOGGER.error(f"Elasticsearch HTTP error: {e.response.status_code} - {error_body}")
         try:
             error_json = json.loads(error_body) if error_body else {}
             error_type = error_json.get('error', {}).get('type', '')
@@ -269,7 +667,7 @@ def search():
             else:
                 error_msg = error_reason
         except:
-            error_msg = f"Elasticsearch error: {e.code} {e.reason}"
+            error_msg = f"Elasticsearch error: {e.response.status_code} {e.response.reason}"
         return jsonify({'error': error_msg}), 500
     except Exception as e:
         LOGGER.error(f"Search error: {e}", exc_info=True)
@@ -291,11 +689,13 @@ def search_stream():
                 yield chunk
         except Exception as e:
             LOGGER.error(f"Streaming search error: {e}", exc_info=True)
-            # Yield a JSON error message
-            error_message = json.dumps({'error': f'Streaming search failed: {str(e)}'})
-            yield error_message
+            # Yield a JSON error message as a complete NDJSON line
+            yield dumps_json({'error': f'Streaming search failed: {str(e)}'}) + b'\n'
 
-    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    # Each event is yielded as soon as Kibana sends it; proxies such as nginx are
+    # told not to buffer the response so agent output reaches the browser promptly
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson', headers=headers)
 
 
 @app.route('/api/conversations', methods=['GET'])
@@ -371,26 +771,54 @@ def conversation_detail(conversation_id):
         LOGGER.error(f"Unexpected error fetching conversation {conversation_id}: {e}", exc_info=True)
         return jsonify({'error': f'Failed to load conversation: {str(e)}'}), 500
 
-def search_all_indices(query: str, search_type: str, size: int = 20, filters: Optional[Dict] = None) -> Dict:
+def search_all_indices(query: str, search_type: str, size: int = 20, filters: Optional[Dict] = None, highlight: bool = True) -> Dict:
     """Search across all indices (flights, airlines, contracts) and combine results."""
     indices = ['flights', 'airlines', 'contracts']
-    all_hits = []
+    hit_streams = []
     total_hits = 0
+    total_relation = 'eq'
     successful_indices = []
     failed_indices = []
     index_counts = {'flights': 0, 'airlines': 0, 'contracts': 0}
 
     # Calculate size per index (ensure at least 1)
     size_per_index = max(1, size // len(indices))
-    
+
+    # Airlines, contracts and the flight facets/total share one _msearch round-trip.
+    # The flight hits come from ES|QL, which _msearch cannot carry, so that query
+    # runs concurrently with it. Results are collected in index order so equal
+    # scores keep a stable order.
+    # The request context is copied into the worker threads for search_preference()
+    esql = SEARCH_EXECUTOR.submit(copy_current_request_context(make_es_request), 'POST', '/_query', flights_esql_body(query, size_per_index, filters))
+    futures = {}
+
+    airlines_body = airlines_search_body(query, search_type, size_per_index, filters, highlight)
+    # An exact total stands in for the _count call made by search_airlines
+    airlines_body['track_total_hits'] = True
+    batched = {'flights-*': flights_stats_body(query, filters), 'airlines': airlines_body}
+    if search_type == 'ai':
+        futures['contracts'] = SEARCH_EXECUTOR.submit(copy_current_request_context(search_contracts), query, search_type, size_per_index, filters, highlight)
+    else:
+        batched['contracts'] = contracts_search_body(query, search_type, size_per_index, filters, highlight)
+    msearch = SEARCH_EXECUTOR.submit(copy_current_request_context(make_es_msearch), batched)
+
     for index in indices:
         try:
             if index == 'flights':
-                result = search_flights(query, search_type, size_per_index, filters)
-            elif index == 'airlines':
-                result = search_airlines(query, search_type, size_per_index, filters)
-            else:  # contracts
-                result = search_contracts(query, search_type, size_per_index, filters)
+                try:
+                    stats_result = msearch.result()['flights-*']
+                    if 'error' in stats_result:
+                        raise SearchResponseError(index, stats_result['error'])
+                    result = flights_esql_response(esql.result(), stats_result, search_type)
+                except Exception as e:
+                    LOGGER.warning(f"ES|QL query failed, falling back to standard search: {e}")
+                    result = search_flights_fallback(query, search_type, size_per_index, filters, highlight)
+            elif index in batched:
+                result = msearch.result()[index]
+                if 'error' in result:
+                    raise SearchResponseError(index, result['error'])
+            else:
+                result = futures[index].result()
             
             if result.get('hits', {}).get('hits'):
                 for hit in result['hits']['hits']:
@@ -398,22 +826,26 @@ def search_all_indices(query: str, search_type: str, size: int = 20, filters: Op
                     # Only set if not already present
                     if '_index' not in hit or not hit['_index']:
                         hit['_index'] = index
-                    all_hits.append(hit)
+                hit_streams.append(result['hits']['hits'])
 
                 # Extract total count
                 result_total = result.get('hits', {}).get('total', 0)
                 if isinstance(result_total, dict):
                     count = result_total.get('value', 0)
                     total_hits += count
+                    # Searches keep Elasticsearch's default of counting up to 10,000 hits,
+                    # so a large index reports a lower bound rather than an exact total
+                    if result_total.get('relation') == 'gte':
+                        total_relation = 'gte'
                     index_counts[index] = count
                 else:
                     total_hits += result_total
                     index_counts[index] = result_total
 
             successful_indices.append(index)
-        except urllib_error.HTTPError as e:
+        except requests.exceptions.HTTPError as e:
             # Check if it's an index_not_found_exception
-            error_body = e.read().decode('utf-8') if hasattr(e, 'read') else str(e)
+            error_body = e.response.text
             try:
                 error_json = json.loads(error_body) if error_body else {}
                 error_type = error_json.get('error', {}).get('type', '')
@@ -425,18 +857,25 @@ def search_all_indices(query: str, search_type: str, size: int = 20, filters: Op
                 pass
             # Re-raise if it's not an index_not_found_exception
             raise
+        except SearchResponseError as e:
+            if e.error.get('type') == 'index_not_found_exception':
+                LOGGER.warning(f"Index '{index}' not found, skipping")
+                failed_indices.append(index)
+                continue
+            raise
         except Exception as e:
             LOGGER.warning(f"Error searching {index} index: {e}")
             failed_indices.append(index)
             continue
     
-    # Sort by score (if available) and limit to size
-    all_hits.sort(key=lambda x: x.get('_score', 0), reverse=True)
-    all_hits = all_hits[:size]
+    # Each index already returns its hits best-first, so a k-way merge of the
+    # streams yields the top hits without sorting everything collected
+    merged = heapq.merge(*hit_streams, key=lambda x: -(x.get('_score') or 0))
+    all_hits = list(itertools.islice(merged, size))
 
     result = {
         'hits': {
-            'total': {'value': total_hits, 'relation': 'eq'},
+            'total': {'value': total_hits, 'relation': total_relation},
             'hits': all_hits
         },
         'search_type': search_type,
@@ -459,15 +898,104 @@ def search_all_indices(query: str, search_type: str, size: int = 20, filters: Op
     return result
 
 
-def search_flights(query: str, search_type: str, size: int = 20, filters: Optional[Dict] = None) -> Dict:
+def filtered_query(query_clause: Dict, filter_clauses: List[Dict]) -> Dict:
+    """Combine a query with filter clauses, keeping the filters out of scoring.
+
+    Without a search query there is nothing to score, so the filters run on their
+    own in a constant_score query, which gives every hit the same score as match_all.
+    """
+    if not filter_clauses:
+        return query_clause
+    if "match_all" in query_clause:
+        return {"constant_score": {"filter": {"bool": {"filter": filter_clauses}}}}
+    return {
+        "bool": {
+            "must": [query_clause],
+            "filter": filter_clauses
+        }
+    }
+
+
+def contract_filter_clauses(filters: Optional[Dict]) -> List[Dict]:
+    """Build the filter clauses for the contract facet filters.
+
+    The year is normalised to an int so '2023' and 2023 produce the same query,
+    letting Elasticsearch reuse its cached filter for either.
+    """
+    filter_clauses = []
+    if not filters:
+        return filter_clauses
+    if filters.get('author'):
+        filter_clauses.append({"term": {"attachment.author.keyword": filters['author']}})
+    if filters.get('upload_year'):
+        upload_year = int(filters['upload_year'])
+        filter_clauses.append({
+            "range": {
+                "upload_date": {
+                    "gte": f"{upload_year}-01-01",
+                    "lt": f"{upload_year + 1}-01-01"
+                }
+            }
+        })
+    return filter_clauses
+
+
+def esql_escape(value: str) -> str:
+    """Escape double quotes so a value can be placed inside an ES|QL string literal."""
+    return value.replace('"', '\\"')
+
+
+def flight_filter_clauses(filters: Optional[Dict]) -> List[Dict]:
+    """Build the Query DSL filter clauses for the flight facet filters."""
+    filter_clauses = []
+    if not filters:
+        return filter_clauses
+    if filters.get('cancelled') is not None:
+        filter_clauses.append({"term": {"Cancelled": filters['cancelled']}})
+    if filters.get('diverted') is not None:
+        filter_clauses.append({"term": {"Diverted": filters['diverted']}})
+    if filters.get('airline'):
+        filter_clauses.append({"term": {"Reporting_Airline": filters['airline']}})
+    if filters.get('origin'):
+        filter_clauses.append({"term": {"Origin": filters['origin']}})
+    if filters.get('dest'):
+        filter_clauses.append({"term": {"Dest": filters['dest']}})
+    if filters.get('flight_date'):
+        filter_clauses.append({
+            "range": {
+                "@timestamp": {
+                    "gte": f"{filters['flight_date']}T00:00:00",
+                    "lt": f"{filters['flight_date']}T23:59:59"
+                }
+            }
+        })
+    return filter_clauses
+
+
+def search_flights(query: str, search_type: str, size: int = 20, filters: Optional[Dict] = None, highlight: bool = True) -> Dict:
     """Search flights indices using ES|QL with LOOKUP JOIN to enrich with airline names."""
+    body = flights_esql_body(query, size, filters)
+
+    try:
+        # Execute ES|QL query
+        esql_result = make_es_request('POST', '/_query', body)
+        stats_result = make_es_request('POST', '/flights-*/_search', flights_stats_body(query, filters), filter_path='aggregations')
+        return flights_esql_response(esql_result, stats_result, search_type)
+
+    except Exception as e:
+        LOGGER.warning(f"ES|QL query failed, falling back to standard search: {e}")
+        # Fallback to original implementation
+        return search_flights_fallback(query, search_type, size, filters, highlight)
+
 
+def flights_esql_body(query: str, size: int = 20, filters: Optional[Dict] = None) -> Dict:
+    """Build the ES|QL request body for the flights search."""
     # Build the WHERE clause for filters
     where_clauses = []
     if query:
         # Add query conditions for different fields
-        query_escaped = query.replace('"', '\\"')  # Escape double quotes for ES|QL
-        where_clauses.append(f'(Flight_Number LIKE "*{query_escaped}*" OR Reporting_Airline LIKE "*{query_escaped}*" OR Origin LIKE "*{query_escaped}*" OR Dest LIKE "*{query_escaped}*")')
+        query_escaped = esql_escape(query)
+        where_clauses.append('(' + ' OR '.join(f'{field} LIKE "*{query_escaped}*"' for field in FLIGHT_QUERY_FIELDS) + ')')
 
     if filters:
         if filters.get('cancelled') is not None:
@@ -475,14 +1003,11 @@ def search_flights(query: str, search_type: str, size: int = 20, filters: Option
         if filters.get('diverted') is not None:
             where_clauses.append(f"Diverted == {str(filters['diverted']).lower()}")
         if filters.get('airline'):
-            airline_escaped = filters['airline'].replace('"', '\\"')
-            where_clauses.append(f'Reporting_Airline == "{airline_escaped}"')
+            where_clauses.append(f'Reporting_Airline == "{esql_escape(filters["airline"])}"')
         if filters.get('origin'):
-            origin_escaped = filters['origin'].replace('"', '\\"')
-            where_clauses.append(f'Origin == "{origin_escaped}"')
+            where_clauses.append(f'Origin == "{esql_escape(filters["origin"])}"')
         if filters.get('dest'):
-            dest_escaped = filters['dest'].replace('"', '\\"')
-            where_clauses.append(f'Dest == "{dest_escaped}"')
+            where_clauses.append(f'Dest == "{esql_escape(filters["dest"])}"')
         if filters.get('flight_date'):
             # Use date range for filtering - ES|QL datetime literal format with double quotes
             flight_date = filters['flight_date']
@@ -505,167 +1030,69 @@ def search_flights(query: str, search_type: str, size: int = 20, filters: Option
         | LIMIT {size}
     """
 
-    body = {
-        "query": esql_query.strip()
-    }
-
     # Log the query for debugging
     LOGGER.info(f"ES|QL Query: {esql_query.strip()}")
     LOGGER.info(f"Filters: {filters}")
 
-    try:
-        # Execute ES|QL query
-        esql_result = make_es_request('POST', '/_query', body)
-
-        # Build a count query that matches the same WHERE clause
-        count_body = {
-            "query": {"match_all": {}}
-        }
+    return {
+        "query": esql_query.strip()
+    }
 
-        # Apply the same filters to the count query
-        filter_clauses = []
 
-        # Always filter out null Flight_Number
-        filter_clauses.append({"exists": {"field": "Flight_Number"}})
 
-        if query:
-            filter_clauses.append({
-                "multi_match": {
-                    "query": query,
-                    "fields": ["Flight_Number", "Reporting_Airline", "Origin", "Dest"]
-                }
-            })
-
-        if filters:
-            if filters.get('cancelled') is not None:
-                filter_clauses.append({"term": {"Cancelled": filters['cancelled']}})
-            if filters.get('diverted') is not None:
-                filter_clauses.append({"term": {"Diverted": filters['diverted']}})
-            if filters.get('airline'):
-                filter_clauses.append({"term": {"Reporting_Airline": filters['airline']}})
-            if filters.get('origin'):
-                filter_clauses.append({"term": {"Origin": filters['origin']}})
-            if filters.get('dest'):
-                filter_clauses.append({"term": {"Dest": filters['dest']}})
-            if filters.get('flight_date'):
-                filter_clauses.append({
-                    "range": {
-                        "@timestamp": {
-                            "gte": f"{filters['flight_date']}T00:00:00",
-                            "lt": f"{filters['flight_date']}T23:59:59"
-                        }
-                    }
-                })
+def flights_stats_body(query: str, filters: Optional[Dict] = None) -> Dict:
+    """Build the size-0 search that gives the flight facets and the total for an ES|QL search.
 
-        if filter_clauses:
-            count_body["query"] = {
-                "bool": {
-                    "filter": filter_clauses
-                }
-            }
-
-        # Get total count
-        count_result = make_es_request('POST', '/flights-*/_count', count_body)
-        total_count = count_result.get('count', 0)
-
-        # Also get aggregations using standard search API
-        aggs_body = {
-            "size": 0,
-            "query": {"match_all": {}},
-            "aggs": {
-                "cancelled": {
-                    "terms": {"field": "Cancelled", "size": 2}
-                },
-                "diverted": {
-                    "terms": {"field": "Diverted", "size": 2}
-                },
-                "airlines": {
-                    "terms": {"field": "Reporting_Airline", "size": 20, "order": {"_count": "desc"}}
-                },
-                "origins": {
-                    "terms": {"field": "Origin", "size": 20, "order": {"_count": "desc"}}
-                },
-                "destinations": {
-                    "terms": {"field": "Dest", "size": 20, "order": {"_count": "desc"}}
-                },
-                "flight_dates": {
-                    "date_histogram": {
-                        "field": "@timestamp",
-                        "calendar_interval": "day",
-                        "format": "yyyy-MM-dd",
-                        "order": {"_key": "desc"}
-                    }
-                }
+    The facets only follow the filters; a filter aggregation counts the flights that
+    also match the query.
+    """
+    match_clauses = [{"exists": {"field": "Flight_Number"}}]
+    if query:
+        match_clauses.append({
+            "multi_match": {
+                "query": query,
+                "fields": FLIGHT_QUERY_FIELDS
             }
-        }
-
-        # Apply filters to aggregation query
-        if filters:
-            filter_clauses = []
-            if filters.get('cancelled') is not None:
-                filter_clauses.append({"term": {"Cancelled": filters['cancelled']}})
-            if filters.get('diverted') is not None:
-                filter_clauses.append({"term": {"Diverted": filters['diverted']}})
-            if filters.get('airline'):
-                filter_clauses.append({"term": {"Reporting_Airline": filters['airline']}})
-            if filters.get('origin'):
-                filter_clauses.append({"term": {"Origin": filters['origin']}})
-            if filters.get('dest'):
-                filter_clauses.append({"term": {"Dest": filters['dest']}})
-            if filters.get('flight_date'):
-                filter_clauses.append({
-                    "range": {
-                        "@timestamp": {
-                            "gte": f"{filters['flight_date']}T00:00:00",
-                            "lt": f"{filters['flight_date']}T23:59:59"
-                        }
-                    }
-                })
+        })
 
-            if filter_clauses:
-                aggs_body["query"] = {
-                    "bool": {
-                        "filter": filter_clauses
-                    }
-                }
+    filter_clauses = flight_filter_clauses(filters)
+    return {
+        "size": 0,
+        "query": {"bool": {"filter": filter_clauses}} if filter_clauses else {"match_all": {}},
+        "aggs": {**FLIGHT_AGGS, "matching_flights": {"filter": {"bool": {"filter": match_clauses}}}}
+    }
 
-        aggs_result = make_es_request('POST', '/flights-*/_search', aggs_body)
 
-        # Convert ES|QL result to standard search response format
-        hits = []
-        columns = esql_result.get('columns', [])
-        column_names = [col['name'] for col in columns]
+def flights_esql_response(esql_result: Dict, stats_result: Dict, search_type: str) -> Dict:
+    """Convert an ES|QL result and its stats search into the standard search response format."""
+    aggregations = stats_result.get('aggregations', {})
+    total_count = aggregations.pop('matching_flights', {}).get('doc_count', 0)
 
-        for row in esql_result.get('values', []):
-            source = {}
-            for i, value in enumerate(row):
-                if i < len(column_names):
-                    source[column_names[i]] = value
+    columns = esql_result.get('columns', [])
+    column_names = [col['name'] for col in columns]
 
-            hit = {
-                '_index': 'flights',
-                '_source': source,
-                '_score': 1.0,
-                'highlight': {}
-            }
-            hits.append(hit)
-
-        return {
-            'hits': {
-                'total': {'value': total_count, 'relation': 'eq'},
-                'hits': hits
-            },
-            'aggregations': aggs_result.get('aggregations', {}),
-            'search_type': search_type
+    # zip() pairs each value with its column and drops any values without one
+    hits = [
+        {
+            '_index': 'flights',
+            '_source': dict(zip(column_names, row)),
+            '_score': 1.0,
+            'highlight': {}
         }
+        for row in esql_result.get('values', [])
+    ]
 
-    except Exception as e:
-        LOGGER.warning(f"ES|QL query failed, falling back to standard search: {e}")
-        # Fallback to original implementation
-        return search_flights_fallback(query, search_type, size, filters)
+    return {
+        'hits': {
+            'total': {'value': total_count, 'relation': 'eq'},
+            'hits': hits
+        },
+        'aggregations': aggregations,
+        'search_type': search_type
+    }
 
 
-def search_flights_fallback(query: str, search_type: str, size: int = 20, filters: Optional[Dict] = None) -> Dict:
+def search_flights_fallback(query: str, search_type: str, size: int = 20, filters: Optional[Dict] = None, highlight: bool = True) -> Dict:
     """Fallback search for flights using standard Query DSL."""
     if query:
         query_clause = {
@@ -684,87 +1111,47 @@ def search_flights_fallback(query: str, search_type: str, size: int = 20, filter
     else:
         query_clause = {"match_all": {}}
 
-    # Add filters if provided
-    if filters:
-        filter_clauses = []
-        if filters.get('cancelled') is not None:
-            filter_clauses.append({"term": {"Cancelled": filters['cancelled']}})
-        if filters.get('diverted') is not None:
-            filter_clauses.append({"term": {"Diverted": filters['diverted']}})
-        if filters.get('airline'):
-            filter_clauses.append({"term": {"Reporting_Airline": filters['airline']}})
-        if filters.get('origin'):
-            filter_clauses.append({"term": {"Origin": filters['origin']}})
-        if filters.get('dest'):
-            filter_clauses.append({"term": {"Dest": filters['dest']}})
-        if filters.get('flight_date'):
-            filter_clauses.append({
-                "range": {
-                    "@timestamp": {
-                        "gte": f"{filters['flight_date']}T00:00:00",
-                        "lt": f"{filters['flight_date']}T23:59:59"
-                    }
-                }
-            })
-
-        if filter_clauses:
-            query_clause = {
-                "bool": {
-                    "must": [query_clause],
-                    "filter": filter_clauses
-                }
-            }
+    filter_clauses = flight_filter_clauses(filters)
+    query_clause = filtered_query(query_clause, filter_clauses)
 
     body = {
         "query": query_clause,
         "size": size,
-        "_source": {
-            "includes": [
-                "FlightID", "Reporting_Airline", "Flight_Number", "Origin", "Dest",
-                "CRSDepTimeLocal", "CRSArrTimeLocal", "DepDelayMin", "ArrDelayMin",
-                "Cancelled", "Diverted", "DistanceMiles", "@timestamp"
-            ]
-        },
-        "highlight": {
-            "fields": {
-                "Flight_Number": {},
-                "Reporting_Airline": {},
-                "Origin": {},
-                "Dest": {}
-            }
-        },
-        "aggs": {
-            "cancelled": {
-                "terms": {"field": "Cancelled", "size": 2}
-            },
-            "diverted": {
-                "terms": {"field": "Diverted", "size": 2}
-            },
-            "airlines": {
-                "terms": {"field": "Reporting_Airline", "size": 20, "order": {"_count": "desc"}}
-            },
-            "origins": {
-                "terms": {"field": "Origin", "size": 20, "order": {"_count": "desc"}}
-            },
-            "destinations": {
-                "terms": {"field": "Dest", "size": 20, "order": {"_count": "desc"}}
-            },
-            "flight_dates": {
-                "date_histogram": {
-                    "field": "@timestamp",
-                    "calendar_interval": "day",
-                    "format": "yyyy-MM-dd",
-                    "order": {"_key": "desc"}
-                }
-            }
-        }
+        "_source": FLIGHT_SOURCE,
+        "aggs": FLIGHT_AGGS
     }
 
-    return make_es_request('POST', '/flights-*/_search', body)
+    if highlight:
+        body["highlight"] = FLIGHT_HIGHLIGHT
+
+    return make_es_request('POST', '/flights-*/_search', body, filter_path=SEARCH_FILTER_PATH)
 
 
-def search_airlines(query: str, search_type: str, size: int = 20, filters: Optional[Dict] = None) -> Dict:
+def search_airlines(query: str, search_type: str, size: int = 20, filters: Optional[Dict] = None, highlight: bool = True) -> Dict:
     """Search airlines index."""
+    body = airlines_search_body(query, search_type, size, filters, highlight)
+
+    # Get the search results
+    search_result = make_es_request('POST', '/airlines/_search', body, filter_path=SEARCH_FILTER_PATH)
+
+    # Get accurate count using _count API
+    count_body = {
+        "query": body["query"]
+    }
+    count_result = make_es_request('POST', '/airlines/_count', count_body)
+    total_count = count_result.get('count', 0)
+
+    # Log the count for debugging
+    LOGGER.info(f"Airlines count: {total_count}")
+
+    # Update the total in the search result
+    search_result['hits']['total'] = {'value': total_count, 'relation': 'eq'}
+
+    return search_result
+
+
+def airlines_search_body(query: str, search_type: str, size: int = 20, filters: Optional[Dict] = None, highlight: bool = True) -> Dict:
+    """Build the search request body for the airlines index."""
     if query:
         if search_type == 'keyword':
             # Only search the text subfield
@@ -805,25 +1192,13 @@ def search_airlines(query: str, search_type: str, size: int = 20, filters: Optio
         if filters.get('airline_code'):
             filter_clauses.append({"term": {"Reporting_Airline": filters['airline_code']}})
 
-        if filter_clauses:
-            query_clause = {
-                "bool": {
-                    "must": [query_clause],
-                    "filter": filter_clauses
-                }
-            }
+        query_clause = filtered_query(query_clause, filter_clauses)
 
     body = {
         "query": query_clause,
         "size": size,
-        "_source": {
-            "includes": ["Reporting_Airline", "Airline_Name"]
-        },
-        "aggs": {
-            "airline_codes": {
-                "terms": {"field": "Reporting_Airline", "size": 50, "order": {"_key": "asc"}}
-            }
-        }
+        "_source": AIRLINE_SOURCE,
+        "aggs": AIRLINE_AGGS
     }
 
     # Add fields for semantic queries
@@ -831,59 +1206,42 @@ def search_airlines(query: str, search_type: str, size: int = 20, filters: Optio
         body["fields"] = ["_inference_fields"]
 
     # Add appropriate highlighting based on search type
-    if query:
+    if query and highlight:
         if search_type == 'semantic':
-            body["highlight"] = {
-                "fields": {
-                    "Airline_Name.semantic": {
-                        "type": "semantic",
-                        "number_of_fragments": 1,
-                        "fragment_size": 200
-                    }
-                }
-            }
+            body["highlight"] = AIRLINE_SEMANTIC_HIGHLIGHT
         else:
-            body["highlight"] = {
-                "fields": {
-                    "Airline_Name.text": {},
-                    "Reporting_Airline": {}
-                }
-            }
+            body["highlight"] = AIRLINE_KEYWORD_HIGHLIGHT
 
-    # Get the search results
-    search_result = make_es_request('POST', '/airlines/_search', body)
+    return body
 
-    # Get accurate count using _count API
-    count_body = {
-        "query": query_clause
-    }
-    count_result = make_es_request('POST', '/airlines/_count', count_body)
-    total_count = count_result.get('count', 0)
-
-    # Log the count for debugging
-    LOGGER.info(f"Airlines count: {total_count}")
-
-    # Update the total in the search result
-    search_result['hits']['total'] = {'value': total_count, 'relation': 'eq'}
-
-    return search_result
 
-
-def search_contracts(query: str, search_type: str, size: int = 20, filters: Optional[Dict] = None) -> Dict:
+def search_contracts(query: str, search_type: str, size: int = 20, filters: Optional[Dict] = None, highlight: bool = True) -> Dict:
     """Search contracts index."""
     if search_type == 'semantic':
-        return semantic_search(query, size, filters)
+        return semantic_search(query, size, filters, highlight)
     elif search_type == 'ai':
-        return ai_agent_search(query, size, filters, conversation_id=None, stream=False)
+        return ai_agent_search(query, size, filters, conversation_id=None, stream=False, highlight=highlight)
     else:  # keyword
-        return keyword_search(query, size, filters)
+        return keyword_search(query, size, filters, highlight)
+
 
+def contracts_search_body(query: str, search_type: str, size: int = 20, filters: Optional[Dict] = None, highlight: bool = True) -> Dict:
+    """Build the search request body for a keyword or semantic contracts search."""
+    if search_type == 'semantic':
+        return semantic_search_body(query, size, filters, highlight)
+    return keyword_search_body(query, size, filters, highlight)
 
-def keyword_search(query: str, size: int = 20, filters: Optional[Dict] = None) -> Dict:
+
+def keyword_search(query: str, size: int = 20, filters: Optional[Dict] = None, highlight: bool = True) -> Dict:
     """Perform Keyword search on contracts index.
 
     Only searches the attachment.content field.
     """
+    return make_es_request('POST', '/contracts/_search', keyword_search_body(query, size, filters, highlight), filter_path=SEARCH_FILTER_PATH)
+
+
+def keyword_search_body(query: str, size: int = 20, filters: Optional[Dict] = None, highlight: bool = True) -> Dict:
+    """Build the keyword search request body for the contracts index."""
     if query:
         query_clause = {
             "match": {
@@ -896,63 +1254,30 @@ def keyword_search(query: str, size: int = 20, filters: Optional[Dict] = None) -
         query_clause = {"match_all": {}}
 
     # Add filters if provided
-    if filters:
-        filter_clauses = []
-        if filters.get('author'):
-            filter_clauses.append({"term": {"attachment.author.keyword": filters['author']}})
-        if filters.get('upload_year'):
-            filter_clauses.append({
-                "range": {
-                    "upload_date": {
-                        "gte": f"{filters['upload_year']}-01-01",
-                        "lt": f"{int(filters['upload_year']) + 1}-01-01"
-                    }
-                }
-            })
-
-        if filter_clauses:
-            query_clause = {
-                "bool": {
-                    "must": [query_clause],
-                    "filter": filter_clauses
-                }
-            }
+    query_clause = filtered_query(query_clause, contract_filter_clauses(filters))
 
     body = {
         "query": query_clause,
         "size": size,
-        "_source": {
-            "includes": ["filename", "attachment.title", "upload_date", "attachment.author", "attachment.description", "airline"],
-            "excludes": ["attachment.content", "content"]
-        },
-        "highlight": {
-            "fields": {
-                "attachment.content": {
-                    "fragment_size": 350,
-                    "number_of_fragments": 5
-                }
-            }
-        },
-        "aggs": {
-            "authors": {
-                "terms": {"field": "attachment.author.keyword", "size": 20, "order": {"_count": "desc"}}
-            },
-            "upload_years": {
-                "date_histogram": {
-                    "field": "upload_date",
-                    "calendar_interval": "year",
-                    "format": "yyyy",
-                    "order": {"_key": "desc"}
-                }
-            }
-        }
+        "_source": CONTRACT_SOURCE,
+        "aggs": CONTRACT_AGGS
     }
 
-    return make_es_request('POST', '/contracts/_search', body)
+    if highlight:
+        body["highlight"] = CONTRACT_KEYWORD_HIGHLIGHT
+
+    return body
 
 
-def semantic_search(query: str, size: int = 20, filters: Optional[Dict] = None) -> Dict:
+def semantic_search(query: str, size: int = 20, filters: Optional[Dict] = None, highlight: bool = True) -> Dict:
     """Perform semantic search using only the semantic_content field."""
+    result = make_es_request('POST', '/contracts/_search', semantic_search_body(query, size, filters, highlight), filter_path=SEARCH_FILTER_PATH)
+    result['search_type'] = 'semantic'
+    return result
+
+
+def semantic_search_body(query: str, size: int = 20, filters: Optional[Dict] = None, highlight: bool = True) -> Dict:
+    """Build the semantic search request body for the contracts index."""
     if query:
         query_clause = {
             "semantic": {
@@ -964,80 +1289,32 @@ def semantic_search(query: str, size: int = 20, filters: Optional[Dict] = None)
         query_clause = {"match_all": {}}
 
     # Add filters if provided
-    if filters:
-        filter_clauses = []
-        if filters.get('author'):
-            filter_clauses.append({"term": {"attachment.author.keyword": filters['author']}})
-        if filters.get('upload_year'):
-            filter_clauses.append({
-                "range": {
-                    "upload_date": {
-                        "gte": f"{filters['upload_year']}-01-01",
-                        "lt": f"{int(filters['upload_year']) + 1}-01-01"
-                    }
-                }
-            })
-
-        if filter_clauses:
-            # Wrap the existing query in a bool query with filters
-            query_clause = {
-                "bool": {
-                    "must": [query_clause],
-                    "filter": filter_clauses
-                }
-            }
+    query_clause = filtered_query(query_clause, contract_filter_clauses(filters))
 
     body = {
         "query": query_clause,
         "size": size,
         "fields": ["_inference_fields"],
-        "_source": {
-            "includes": ["filename", "attachment.title", "upload_date", "attachment.author", "attachment.description", "airline"],
-            "excludes": ["attachment.content", "content"]
-        },
-        "aggs": {
-            "authors": {
-                "terms": {"field": "attachment.author.keyword", "size": 20, "order": {"_count": "desc"}}
-            },
-            "upload_years": {
-                "date_histogram": {
-                    "field": "upload_date",
-                    "calendar_interval": "year",
-                    "format": "yyyy",
-                    "order": {"_key": "desc"}
-                }
-            }
-        }
+        "_source": CONTRACT_SOURCE,
+        "aggs": CONTRACT_AGGS
     }
 
     # Add highlighting for semantic and text fields to drive UI snippets
-    if query:
-        body["highlight"] = {
-            "fields": {
-                "semantic_content": {
-                    "type": "semantic",
-                    "number_of_fragments": 1,
-                    "fragment_size": 10
-                },
-                "attachment.content": {
-                    "fragment_size": 10,
-                    "number_of_fragments": 1
-                },
-                "attachment.title": {},
-                "attachment.description": {
-                    "fragment_size": 10,
-                    "number_of_fragments": 1
-                }
-            }
-        }
+    if query and highlight:
+        body["highlight"] = CONTRACT_SEMANTIC_HIGHLIGHT
+
+    return body
 
-    result = make_es_request('POST', '/contracts/_search', body)
-    result['search_type'] = 'semantic'
-    return result
 
+def rrf_rejected(error: requests.exceptions.HTTPError) -> bool:
+    """Check whether Elasticsearch refused a search because of its RRF rank clause."""
+    details = error.response.text.lower()
+    return error.response.status_code == 400 and ('rank' in details or 'rrf' in details)
 
-def ai_agent_search(query: str, size: int = 20, filters: Optional[Dict] = None, conversation_id: Optional[str] = None, stream: bool = False):
+
+def ai_agent_search(query: str, size: int = 20, filters: Optional[Dict] = None, conversation_id: Optional[str] = None, stream: bool = False, highlight: bool = True):
     """Perform AI Agent Builder search with tool calling."""
+    global RRF_SUPPORTED
     if not query:
         return {} if not stream else iter([])
 
@@ -1051,54 +1328,57 @@ def ai_agent_search(query: str, size: int = 20, filters: Optional[Dict] = None,
             body["conversation_id"] = conversation_id
         response = make_kibana_request('POST', '/api/agent_builder/converse/async', body=body, stream=True)
 
+        def stream_event(data: bytes, event_type: Optional[str]) -> bytes:
+            """Turn the data of one SSE event into an NDJSON line for the browser."""
+            try:
+                payload = loads_json(data) if data else {}
+            except ValueError:
+                payload = {"raw": data.decode('utf-8', errors='replace')}
+
+            if 'kind' not in payload:
+                if event_type:
+                    payload['kind'] = event_type
+                elif 'type' in payload:
+                    payload['kind'] = payload['type']
+
+            if event_type:
+                payload.setdefault('event', event_type)
+
+            return dumps_json(payload) + b'\n'
+
         def event_stream():
+            # Lines are handled as bytes; only event names are decoded, and the
+            # data is handed to the JSON parser as-is
             event_type: Optional[str] = None
             data_lines = []
 
-            for raw_line in response.iter_lines(decode_unicode=True):
+            for raw_line in response.iter_lines():
                 if raw_line is None:
                     continue
 
-                stripped = raw_line.rstrip('\r\n')
+                stripped = raw_line.rstrip(b'\r\n')
                 LOGGER.debug("AI agent stream line: %s", stripped)
 
-                if stripped == '':
+                if not stripped:
                     if not data_lines:
                         event_type = None
                         continue
 
-                    data_str = '\n'.join(data_lines)
+                    yield stream_event(b'\n'.join(data_lines), event_type)
                     data_lines = []
-
-                    try:
-                        payload = json.loads(data_str) if data_str else {}
-                    except json.JSONDecodeError:
-                        payload = {"raw": data_str}
-
-                    if 'kind' not in payload:
-                        if event_type:
-                            payload['kind'] = event_type
-                        elif 'type' in payload:
-                            payload['kind'] = payload['type']
-
-                    if event_type:
-                        payload.setdefault('event', event_type)
-
-                    serialized = (json.dumps(payload) + '\n').encode('utf-8')
-                    yield serialized
                     event_type = None
                     continue
 
-                if stripped.startswith(':'):
+                if stripped.startswith(b':'):
                     # Comment / heartbeat line
                     continue
 
-                if stripped.startswith('event:'):
-                    event_type = stripped[len('event:'):].strip() or None
+                if stripped.startswith(b'event:'):
+                    event_type = stripped[len(b'event:'):].strip().decode('utf-8', errors='replace') or None
                     continue
 
-                if stripped.startswith('data:'):
-                    data_lines.append(stripped[len('data:'):].lstrip())
+                if stripped.startswith(b'data:'):
+                    data_lines.append(stripped[len(b'data:'):].lstrip())
                     continue
 
                 # Fallback: treat as a data line
@@ -1106,22 +1386,7 @@ def ai_agent_search(query: str, size: int = 20, filters: Optional[Dict] = None,
 
             # Flush any remaining buffered data (in case stream ends without blank line)
             if data_lines:
-                data_str = '\n'.join(data_lines)
-                try:
-                    payload = json.loads(data_str) if data_str else {}
-                except json.JSONDecodeError:
-                    payload = {"raw": data_str}
-
-                if 'kind' not in payload:
-                    if event_type:
-                        payload['kind'] = event_type
-                    elif 'type' in payload:
-                        payload['kind'] = payload['type']
-
-                if event_type:
-                    payload.setdefault('event', event_type)
-
-                yield (json.dumps(payload) + '\n').encode('utf-8')
+                yield stream_event(b'\n'.join(data_lines), event_type)
 
         return event_stream()
 
@@ -1155,91 +1420,45 @@ def ai_agent_search(query: str, size: int = 20, filters: Optional[Dict] = None,
     }
 
     # Add filters if provided
-    if filters:
-        filter_clauses = []
-        if filters.get('author'):
-            filter_clauses.append({"term": {"attachment.author.keyword": filters['author']}})
-        if filters.get('upload_year'):
-            filter_clauses.append({
-                "range": {
-                    "upload_date": {
-                        "gte": f"{filters['upload_year']}-01-01",
-                        "lt": f"{int(filters['upload_year']) + 1}-01-01"
-                    }
-                }
-            })
-
-        if filter_clauses:
-            # Wrap the existing query in a bool query with filters
-            query_clause = {
-                "bool": {
-                    "must": [query_clause],
-                    "filter": filter_clauses
-                }
-            }
+    query_clause = filtered_query(query_clause, contract_filter_clauses(filters))
 
     body = {
         "query": query_clause,
         "size": size,
         "fields": ["_inference_fields"],
-        "_source": {
-            "includes": ["filename", "attachment.title", "upload_date", "attachment.author", "attachment.description", "airline"],
-            "excludes": ["attachment.content", "content"]
-        },
-        "highlight": {
-            "fields": {
-                "attachment.content": {
-                    "fragment_size": 200,
-                    "number_of_fragments": 3
-                },
-                "attachment.title": {},
-                "attachment.description": {
-                    "fragment_size": 150,
-                    "number_of_fragments": 2
-                }
-            }
-        },
-        "aggs": {
-            "authors": {
-                "terms": {"field": "attachment.author.keyword", "size": 20, "order": {"_count": "desc"}}
-            },
-            "upload_years": {
-                "date_histogram": {
-                    "field": "upload_date",
-                    "calendar_interval": "year",
-                    "format": "yyyy",
-                    "order": {"_key": "desc"}
-                }
-            }
-        }
+        "_source": CONTRACT_SOURCE,
+        "aggs": CONTRACT_AGGS
     }
 
-    # Only use RRF when there's a query (it's not needed for match_all)
-    if query:
+    if highlight:
+        body["highlight"] = CONTRACT_HYBRID_HIGHLIGHT
+
+    # Only use RRF when there's a query (it's not needed for match_all) and the
+    # cluster hasn't already rejected it
+    if query and RRF_SUPPORTED:
         body["rank"] = {"rrf": {}}
 
     try:
-        results = make_es_request('POST', '/contracts/_search', body)
-        results['search_type'] = 'ai_agent'
-        return results
-    except Exception as e:
-        # If RRF fails, try without it
-        if "rank" in str(e).lower() or "rrf" in str(e).lower():
-            LOGGER.warning(f"RRF not supported, trying hybrid search without RRF: {e}")
-            # Remove rank clause and retry
-            if "rank" in body:
-                del body["rank"]
-            try:
-                results = make_es_request('POST', '/contracts/_search', body)
-                results['search_type'] = 'ai_agent'
-                return results
-            except Exception as e2:
-                LOGGER.warning(f"Hybrid search failed, falling back to semantic: {e2}")
-                return semantic_search(query, size, filters)
-        else:
-            # Fallback to semantic search if hybrid fails for other reasons
+        results = make_es_request('POST', '/contracts/_search', body, filter_path=SEARCH_FILTER_PATH)
+    except requests.exceptions.HTTPError as e:
+        if "rank" not in body or not rrf_rejected(e):
             LOGGER.warning(f"Hybrid search failed, falling back to semantic: {e}")
-            return semantic_search(query, size, filters)
+            return semantic_search(query, size, filters, highlight)
+        # Remember the rejection so later searches go straight to the query without RRF
+        RRF_SUPPORTED = False
+        LOGGER.warning(f"RRF not supported, trying hybrid search without RRF: {e}")
+        del body["rank"]
+        try:
+            results = make_es_request('POST', '/contracts/_search', body, filter_path=SEARCH_FILTER_PATH)
+        except Exception as e2:
+            LOGGER.warning(f"Hybrid search failed, falling back to semantic: {e2}")
+            return semantic_search(query, size, filters, highlight)
+    except Exception as e:
+        LOGGER.warning(f"Hybrid search failed, falling back to semantic: {e}")
+        return semantic_search(query, size, filters, highlight)
+
+    results['search_type'] = 'ai_agent'
+    return results
 
 
 if __name__ == '__main__':
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+
+"""gunicorn settings for serving the AIR Search app (loaded automatically when gunicorn runs from website/)."""
+
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+
+# Threaded workers keep client connections alive between requests and handle
+# several searches at once while they wait on Elasticsearch and Kibana
+worker_class = 'gthread'
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+keepalive = 5
+
+# AI agent responses are streamed and can take a while to finish
+timeout = 120
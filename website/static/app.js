@@ -1705,11 +1705,12 @@ async function displayResults(data) {
     // Add stats
     const totalValue = typeof total === 'object' ? total.value : total;
     const indicesInfo = data.searched_indices ? ` (${data.searched_indices.join(', ')})` : '';
-    const resultText = totalValue === 1 ? 'Result' : 'Results';
+    const totalSuffix = total && total.relation === 'gte' ? '+' : '';
+    const resultText = totalValue === 1 && !totalSuffix ? 'Result' : 'Results';
     html += `
         <div class="text-center mt-4 pt-3 border-top">
             <p class="text-muted mb-0 small">
-                <i class="bi bi-bar-chart"></i> ${totalValue.toLocaleString()} ${resultText}${indicesInfo}
+                <i class="bi bi-bar-chart"></i> ${totalValue.toLocaleString()}${totalSuffix} ${resultText}${indicesInfo}
             </p>
         </div>
     `;
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+
+"""WSGI entry point for serving the AIR Search app with a production server such as gunicorn."""
+
+import logging
+
+from app import app  # noqa: F401
+
+# INFO would log every search body and Kibana request, so production logs warnings
+# and errors only; `python app.py` keeps INFO logging for local debugging
+logging.basicConfig(level=logging.WARNING)